@@ -71,6 +71,10 @@ EMAIL_PORT = os.getenv('EMAIL_PORT')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
+
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', 300))
+TRANSACTION_LIST_COMPAT = os.getenv('TRANSACTION_LIST_COMPAT', 'true').lower() == 'true'
 
 ROOT_URLCONF = 'budget_bud.urls'
 
@@ -101,6 +105,30 @@ DATABASES = {
     )
 }
 
+# Report invalidation bumps counters in the cache, and the scheduler worker bumps them from another
+# process, so the cache has to be shared: a per-process backend such as LocMemCache would keep serving
+# stale reports. The database cache works out of the box (its tables are created by migration 0008);
+# pointing CACHE_BACKEND and CACHE_LOCATION at Redis saves the database round trip on every report read.
+# Generation counters get their own alias so culling report entries never throws them away.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'report_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 20000)),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    'report_generations': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('GENERATION_CACHE_LOCATION', 'report_generation_cache'),
+        # One counter per user and family; the cap is only there so the table can never be culled.
+        'OPTIONS': {
+            'MAX_ENTRIES': 10_000_000,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -10,7 +10,9 @@ from .models import (
     Transaction,
     Account,
     BalanceHistory,
-    SavingsGoal
+    SavingsGoal,
+    MonthlyRollup,
+    OutboundEmail
 )
 
 @admin.register(Report)
@@ -80,4 +82,15 @@ class BalanceHistoryAdmin(admin.ModelAdmin):
 class SavingsGoalAdmin(admin.ModelAdmin):
     list_display = ('account', 'target_balance', 'current_balance', 'goal_met', 'start_date', 'end_date')
     search_fields = ('account__name',)
-    list_filter = ('goal_met', 'start_date', 'end_date')
\ No newline at end of file
+    list_filter = ('goal_met', 'start_date', 'end_date')
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'user', 'category', 'budget', 'account', 'transaction_type', 'total', 'count')
+    search_fields = ('user__username', 'category__name', 'budget__name', 'account__name')
+    list_filter = ('transaction_type', 'month')
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    search_fields = ('recipient', 'subject')
+    list_filter = ('status',)
@@ -5,4 +5,4 @@ class BudgetBudApiConfig(AppConfig):
     name = 'budget_bud_api'
 
     def ready(self):
-        pass
\ No newline at end of file
+        from . import signals
\ No newline at end of file
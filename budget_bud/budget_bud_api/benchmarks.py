@@ -0,0 +1,294 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings, setup_databases, teardown_databases
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .cache import GENERATION_CACHE
+from .ledger import create_transactions
+from .models import Family, Category, Budget, Account, Transaction, BudgetGoal, SavingsGoal
+
+FAMILY_SIZE = 6
+HISTORY_DAYS = 730
+
+# Auth, sign-up, contact and family invitation routes are left out: they send mail or only issue tokens.
+BENCHMARK_ROUTES = [
+    ('categories', 'get', '/api/categories/', None),
+    ('budgets', 'get', '/api/budget/', None),
+    ('transactions', 'get', '/api/transaction/', None),
+    ('all_transactions', 'get', '/api/transactions/', None),
+    ('accounts', 'get', '/api/accounts/', None),
+    ('profile_stats', 'get', '/api/profile/stats/', None),
+    ('user_reports', 'get', '/api/user/reports/', None),
+    ('dashboard_report_options', 'get', '/api/user/dashboard-report-options/', None),
+    ('family', 'get', '/api/family/', None),
+    ('family_overview_category', 'get', '/api/family/overview/?Category=true', None),
+    ('family_overview_transaction', 'get', '/api/family/overview/?Transaction=true', None),
+    ('family_history', 'post', '/api/family/history/',
+     lambda context: {'user_id': context['member_id'], **context['date_range']}),
+    ('category_data', 'get', '/api/category/data/', None),
+    ('category_data_range', 'post', '/api/category/data/', lambda context: context['date_range']),
+    ('category_history', 'post', '/api/category/history/',
+     lambda context: {'category_id': context['category_id'], **context['date_range']}),
+    ('category_line_chart', 'get', '/api/category/history/line-chart/', None),
+    ('category_line_chart_range', 'post', '/api/category/history/line-chart/', lambda context: context['date_range']),
+    ('budget_history', 'post', '/api/budget-history/',
+     lambda context: {'budget_id': context['budget_id'], **context['date_range']}),
+    ('budget_transaction_overview', 'post', '/api/budget-transaction-overview/', lambda context: context['date_range']),
+    ('transaction_bar_chart', 'post', '/api/transaction-bar-chart/', lambda context: context['date_range']),
+    ('transaction_table', 'post', '/api/transaction-table-view/', lambda context: context['date_range']),
+    ('transaction_pie_chart', 'post', '/api/transaction-pie-chart/', lambda context: context['date_range']),
+    ('accounts_overview', 'get', '/api/accounts/overview-report/', None),
+    ('accounts_overview_range', 'post', '/api/accounts/overview-report/', lambda context: context['date_range']),
+    ('net_worth', 'get', '/api/accounts/net-worth/', None),
+    ('account_history', 'post', '/api/account/history/',
+     lambda context: {'account_id': context['account_id'], **context['date_range']}),
+    ('transaction_create', 'post', '/api/transaction/', lambda context: context['transaction']),
+    ('transaction_import', 'post', '/api/transaction-import/', lambda context: context['import_rows']),
+]
+
+FAMILY_VIEW_ROUTES = {
+    'categories', 'budgets', 'accounts', 'category_data', 'category_data_range', 'category_line_chart_range',
+    'budget_transaction_overview', 'transaction_bar_chart', 'transaction_pie_chart', 'accounts_overview_range',
+    'net_worth', 'transaction_import',
+}
+
+
+# The most queries each route may run, whatever the dataset size. Raise an entry only together with
+# the change that needs it.
+QUERY_BUDGETS = {
+    'account_history': 1,
+    'accounts': 1,
+    'accounts_family': 2,
+    'accounts_overview': 2,
+    'accounts_overview_range': 2,
+    'accounts_overview_range_family': 4,
+    'all_transactions': 2,
+    'budget_history': 1,
+    'budget_transaction_overview': 4,
+    'budget_transaction_overview_family': 6,
+    'budgets': 1,
+    'budgets_family': 2,
+    'categories': 1,
+    'categories_family': 2,
+    'category_data': 2,
+    'category_data_family': 4,
+    'category_data_range': 3,
+    'category_data_range_family': 5,
+    'category_history': 1,
+    'category_line_chart': 2,
+    'category_line_chart_range': 2,
+    'category_line_chart_range_family': 4,
+    'dashboard_report_options': 1,
+    'family': 2,
+    'family_history': 3,
+    'family_overview_category': 2,
+    'family_overview_transaction': 2,
+    'net_worth': 2,
+    'net_worth_family': 4,
+    'profile_stats': 1,
+    'transaction_bar_chart': 2,
+    'transaction_bar_chart_family': 4,
+    'transaction_create': 29,
+    'transaction_import': 17,
+    'transaction_import_family': 18,
+    'transaction_pie_chart': 2,
+    'transaction_pie_chart_family': 4,
+    'transaction_table': 1,
+    'transactions': 1,
+    'user_reports': 1,
+}
+
+
+def seed_dataset(size, seed=0):
+    # A family of six: the benchmarked user owns `size` transactions and each other member a tenth of that,
+    # spread over two years up to today.
+    randomizer = random.Random(seed)
+    prefix = f'benchmark-{uuid.uuid4().hex[:8]}'
+    today = timezone.now().date()
+
+    family = Family.objects.create(name=prefix[:30])
+    users = []
+    owned = {}
+    for index in range(FAMILY_SIZE):
+        user = User.objects.create_user(f'{prefix}-{index}', f'{prefix}-{index}@example.com')
+        family.members.add(user)
+        users.append(user)
+
+        accounts = [Account.objects.create(name=f'Account {number}', balance=1000, user=user, family=family)
+                    for number in range(3)]
+        categories = Category.objects.bulk_create([Category(name=f'Category {number}', user=user)
+                                                   for number in range(8)])
+        budgets = Budget.objects.bulk_create([Budget(name=f'Budget {number}', total_amount=500, user=user)
+                                              for number in range(4)])
+        owned[user.id] = (accounts, categories, budgets)
+
+        for budget in budgets:
+            BudgetGoal.objects.create(budget=budget, target_balance=250, start_date=today - timedelta(days=30),
+                                      end_date=today + timedelta(days=30))
+        SavingsGoal.objects.create(account=accounts[0], target_balance=5000, start_date=today - timedelta(days=30),
+                                   end_date=today + timedelta(days=30))
+
+        count = size if index == 0 else size // 10
+        accounts, categories, budgets = owned[user.id]
+        create_transactions([
+            Transaction(
+                date=today - timedelta(days=randomizer.randrange(HISTORY_DAYS)),
+                amount=randomizer.randrange(100, 50000) / 100,
+                transaction_type=randomizer.choice(['income', 'expense']),
+                description=f'Transaction {number}',
+                account=randomizer.choice(accounts),
+                category=randomizer.choice(categories),
+                budget=randomizer.choice(budgets),
+                user=user,
+                family=family,
+            )
+            for number in range(count)
+        ])
+
+    user = users[0]
+    accounts, categories, budgets = owned[user.id]
+    start_date = today - timedelta(days=90)
+    row = {
+        'date': str(today),
+        'amount': '12.34',
+        'transaction_type': 'expense',
+        'description': 'Benchmark',
+        'account': accounts[0].id,
+        'category': categories[0].id,
+        'budget': budgets[0].id,
+    }
+    context = {
+        'date_range': {'start_date': str(start_date), 'end_date': str(today)},
+        'member_id': users[1].id,
+        'account_id': accounts[0].id,
+        'category_id': categories[0].id,
+        'budget_id': budgets[0].id,
+        'transaction': row,
+        'import_rows': [row] * 50,
+    }
+    return user, context
+
+
+def measure_request(client, method, path, data, repeat):
+    request = getattr(client, method)
+    timings = []
+    for _ in range(repeat):
+        # The query log is capped, so a long seeding run can leave it full and hide every new query.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(path, data, format='json') if data is not None else request(path)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_count = len(queries.captured_queries)
+
+    # Tracing allocations slows everything down, so peak memory comes from one extra, untimed request.
+    tracemalloc.start()
+    try:
+        request(path, data, format='json') if data is not None else request(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'time_ms': round(statistics.median(timings), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def benchmark_routes(user, context, repeat=3, routes=None):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    results = {}
+    for name, method, path, data in BENCHMARK_ROUTES:
+        if routes and name not in routes:
+            continue
+        variants = [(name, path)]
+        if name in FAMILY_VIEW_ROUTES:
+            separator = '&' if '?' in path else '?'
+            variants.append((f'{name}_family', f'{path}{separator}familyView=true'))
+        for variant, variant_path in variants:
+            results[variant] = measure_request(client, method, variant_path, data(context) if data else None, repeat)
+    return results
+
+
+def run_benchmarks(sizes, repeat=3, routes=None):
+    # Datasets are seeded into a throwaway test database, never the configured one, with caching off
+    # so every request does its full work.
+    results = {}
+    settings = {
+        'ALLOWED_HOSTS': ['testserver'],
+        'SECURE_SSL_REDIRECT': False,
+        'CACHES': {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+                   for alias in ('default', GENERATION_CACHE)},
+    }
+    databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        with override_settings(**settings):
+            for size in sizes:
+                user, context = seed_dataset(size, seed=size)
+                for route, measurement in benchmark_routes(user, context, repeat, routes).items():
+                    results[f'{size}:{route}'] = measurement
+    finally:
+        teardown_databases(databases, verbosity=0)
+    return results
+
+
+def find_regressions(results, baseline, time_tolerance=0.5, memory_tolerance=0.5, time_floor_ms=10,
+                     query_budgets=QUERY_BUDGETS):
+    regressions = []
+    for key, measurement in sorted(results.items()):
+        if not 200 <= measurement['status'] < 300:
+            regressions.append(f"{key}: responded with status {measurement['status']}")
+
+        budget = query_budgets.get(key.split(':', 1)[1])
+        if budget is not None and measurement['queries'] > budget:
+            regressions.append(f"{key}: {measurement['queries']} queries, budget {budget}")
+
+        expected = baseline.get(key)
+        if not expected:
+            continue
+        if measurement['queries'] > expected['queries']:
+            regressions.append(f"{key}: {measurement['queries']} queries, baseline {expected['queries']}")
+        if (measurement['time_ms'] > expected['time_ms'] * (1 + time_tolerance)
+                and measurement['time_ms'] - expected['time_ms'] > time_floor_ms):
+            regressions.append(f"{key}: {measurement['time_ms']} ms, baseline {expected['time_ms']} ms")
+        if measurement['peak_kb'] > expected['peak_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{key}: {measurement['peak_kb']} KiB peak, baseline {expected['peak_kb']} KiB")
+
+    # A route whose query count grows with the dataset is an N+1 loop, baseline or not.
+    by_route = {}
+    for key, measurement in results.items():
+        size, route = key.split(':', 1)
+        by_route.setdefault(route, []).append((int(size), measurement['queries']))
+    for route, counts in sorted(by_route.items()):
+        counts.sort()
+        if counts[-1][1] > counts[0][1]:
+            regressions.append(
+                f"{route}: {counts[0][1]} queries at {counts[0][0]} transactions but "
+                f"{counts[-1][1]} at {counts[-1][0]}"
+            )
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
@@ -0,0 +1,104 @@
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction as db_transaction
+from .members import family_ids
+
+# Generation counters live in their own cache so culling report entries never resets them.
+GENERATION_CACHE = 'report_generations'
+
+
+def generation_key(owner_type, owner_id):
+    return f"report_generation:{owner_type}:{owner_id}"
+
+
+def owner_generation(owner_type, owner_id):
+    generations = caches[GENERATION_CACHE]
+    key = generation_key(owner_type, owner_id)
+    generation = generations.get(key)
+    if generation is None:
+        # Counters start from the clock rather than 1 so one that was evicted can never come
+        # back at a value that older entries were stored under.
+        generations.add(key, time.time_ns(), None)
+        generation = generations.get(key)
+    return generation
+
+
+def normalize_param(value):
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def report_cache_key(owner_type, owner_ids, endpoint, params=()):
+    if not isinstance(owner_ids, tuple):
+        owner_ids = (owner_ids,)
+    generations = [str(owner_generation(owner_type, owner_id)) for owner_id in owner_ids]
+    return ':'.join(['report', endpoint, owner_type, '-'.join(map(str, owner_ids)), *generations,
+                     *(normalize_param(param) for param in params)])
+
+
+def cached_report(owner_type, owner_ids, endpoint, params, compute):
+    key = report_cache_key(owner_type, owner_ids, endpoint, params)
+    data = cache.get(key)
+    if data is None:
+        data = compute()
+        cache.set(key, data, settings.REPORT_CACHE_TIMEOUT)
+    return data
+
+
+def report_owner(request, family_view=False, family=None):
+    # Family reports cover the members of every family the requester belongs to, so they are keyed by,
+    # and invalidated through, that whole set of families.
+    if family_view and family:
+        return 'family', family_ids(request)
+    return 'user', request.user.id
+
+
+def bump_generations(user_ids=(), family_ids=()):
+    from .models import Family
+
+    user_ids = {user_id for user_id in user_ids if user_id}
+    family_ids = {family_id for family_id in family_ids if family_id}
+    if user_ids:
+        family_ids.update(Family.objects.filter(members__in=user_ids).values_list('id', flat=True))
+
+    keys = [generation_key('user', user_id) for user_id in user_ids]
+    keys += [generation_key('family', family_id) for family_id in family_ids]
+
+    def bump():
+        generations = caches[GENERATION_CACHE]
+        for key in keys:
+            try:
+                generations.incr(key)
+            except ValueError:
+                # Nothing has been cached for this owner since the counter was evicted; the next
+                # read starts a fresh one.
+                pass
+
+    # Bumping only once the write is visible keeps a concurrent request from caching the old
+    # data under the new generation.
+    db_transaction.on_commit(bump)
+
+
+def bump_transaction_owners(transactions):
+    from .models import Account, Budget, Category
+
+    # Reports are keyed by the owner of the budget, account or category as well as by the user who
+    # posted the row, and a family member can post onto another member's.
+    transactions = [transaction for transaction in transactions if transaction]
+    owners = (
+        Budget.objects.filter(pk__in={transaction.budget_id for transaction in transactions})
+        .values_list('user_id', flat=True)
+        .union(
+            Account.objects.filter(pk__in={transaction.account_id for transaction in transactions})
+            .values_list('user_id', flat=True),
+            Category.objects.filter(pk__in={transaction.category_id for transaction in transactions})
+            .values_list('user_id', flat=True),
+        )
+    )
+    bump_generations(user_ids=[transaction.user_id for transaction in transactions] + list(owners),
+                     family_ids=[transaction.family_id for transaction in transactions])
@@ -0,0 +1,69 @@
+from django.db import transaction as db_transaction
+from django.db.models import F
+from .cache import bump_generations
+from .models import BudgetGoal, SavingsGoal, OutboundEmail
+from .utils import SendEmail
+
+
+def sweep_goals(goals, progress_field, owner_field, met_message, failed_message, batch_size=1000):
+    met = {f'{progress_field}__gte': F('target_balance')}
+    newly_met = goals.filter(goal_met=False, **met)
+    owners = set(newly_met.values_list(f'{owner_field}__user_id', flat=True))
+    flipped = newly_met.update(goal_met=True)
+    bump_generations(user_ids=owners)
+
+    pending = (
+        goals.filter(alert_sent=False)
+        .order_by('id')
+        .values(
+            'id', 'target_balance',
+            progress=F(progress_field),
+            name=F(f'{owner_field}__name'),
+            username=F(f'{owner_field}__user__username'),
+            email=F(f'{owner_field}__user__email'),
+        )
+    )
+
+    mailer = SendEmail()
+    alerted = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+
+        emails = []
+        for goal in batch:
+            data = {"username": goal['username'], owner_field: goal['name']}
+            if goal['progress'] >= goal['target_balance']:
+                data["amount_saved"] = goal['progress'] - goal['target_balance']
+                emails.append(mailer.build_mail(goal['email'], met_message, data))
+            else:
+                data["over_amount"] = goal['target_balance'] - goal['progress']
+                emails.append(mailer.build_mail(goal['email'], failed_message, data))
+
+        ids = [goal['id'] for goal in batch]
+        with db_transaction.atomic():
+            OutboundEmail.objects.bulk_create(emails, batch_size=batch_size)
+            goals.model.objects.filter(id__in=ids).update(alert_sent=True)
+
+        alerted += len(batch)
+        last_id = ids[-1]
+
+    return flipped, alerted
+
+
+def sweep_budget_goals(end_date, batch_size=1000):
+    return sweep_goals(
+        BudgetGoal.objects.filter(end_date=end_date), 'current_balance', 'budget',
+        'BudgetGoal', 'BudgetGoalFailed', batch_size=batch_size
+    )
+
+
+def sweep_savings_goals(end_date, batch_size=1000):
+    # Nothing keeps SavingsGoal.current_balance up to date, so savings goals are judged on the
+    # balance of their account.
+    return sweep_goals(
+        SavingsGoal.objects.filter(end_date=end_date), 'account__balance', 'account',
+        'SavingsGoal', 'SavingsGoalFailed', batch_size=batch_size
+    )
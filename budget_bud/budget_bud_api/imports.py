@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+IMPORT_FORMATS = {
+    'csv': 'csv',
+    'ofx': 'ofx',
+    'qfx': 'ofx',
+    'json': 'json',
+}
+
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))', re.S | re.I)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+class TransactionImportError(ValueError):
+    pass
+
+
+def import_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension not in IMPORT_FORMATS:
+        raise TransactionImportError(f"Unsupported file type '{extension}'. Use one of: {', '.join(IMPORT_FORMATS)}.")
+    return IMPORT_FORMATS[extension]
+
+
+def decode_upload(upload):
+    content = upload.read()
+    try:
+        return content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return content.decode('cp1252')
+
+
+def parse_csv_rows(text):
+    reader = csv.DictReader(io.StringIO(text))
+    return [
+        {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        for row in reader
+    ]
+
+
+def parse_ofx_date(value):
+    return datetime.strptime(value.strip()[:8], '%Y%m%d').date().isoformat()
+
+
+def parse_ofx_rows(text):
+    # OFX statements are SGML: leaf elements are usually left unclosed, so each field is read
+    # up to the next tag or line break rather than parsed as XML.
+    rows = []
+    for block in OFX_TRANSACTION.findall(text):
+        fields = {name.upper(): value.strip() for name, value in OFX_FIELD.findall(block)}
+        try:
+            amount = Decimal(fields.get('TRNAMT', ''))
+            date = parse_ofx_date(fields.get('DTPOSTED', ''))
+        except (InvalidOperation, ValueError):
+            raise TransactionImportError(f"Invalid OFX transaction: {block.strip()[:80]}")
+
+        rows.append({
+            'date': date,
+            'amount': str(abs(amount)),
+            'transaction_type': 'income' if amount >= 0 else 'expense',
+            'description': fields.get('MEMO') or fields.get('NAME', ''),
+        })
+    return rows
+
+
+def parse_json_rows(text):
+    try:
+        rows = json.loads(text)
+    except ValueError:
+        raise TransactionImportError("Invalid JSON file.")
+    if isinstance(rows, dict):
+        rows = rows.get('transactions')
+    if not isinstance(rows, list):
+        raise TransactionImportError("Expected a list of transactions.")
+    return rows
+
+
+def parse_rows(import_type, text):
+    if import_type == 'json':
+        return parse_json_rows(text)
+    elif import_type == 'csv':
+        return parse_csv_rows(text)
+    elif import_type == 'ofx':
+        return parse_ofx_rows(text)
+    raise TransactionImportError(f"Unsupported import format: {import_type}")
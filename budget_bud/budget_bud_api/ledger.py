@@ -0,0 +1,318 @@
+import operator
+from functools import reduce
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum, Q, Max, Case, When, Value, DecimalField, IntegerField, Window
+from django.db.models.functions import RowNumber
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from .cache import bump_generations, bump_transaction_owners
+from .models import Account, BalanceHistory, BudgetGoal, Transaction
+
+# Saving or deleting one transaction touches at most two (budget, date) pairs.
+GOAL_WINDOW_CASE_LIMIT = 2
+
+
+def signed_amount(transaction_type, amount):
+    if transaction_type == 'income':
+        return Decimal(amount)
+    elif transaction_type == 'expense':
+        return -Decimal(amount)
+    return Decimal(0)
+
+
+def day_net(account_id, date):
+    totals = Transaction.objects.filter(account_id=account_id, date=date).aggregate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expense=Sum('amount', filter=Q(transaction_type='expense')),
+    )
+    return (totals['income'] or 0) - (totals['expense'] or 0)
+
+
+def balance_before(account_id, date, current_balance, deltas=None):
+    snapshots = BalanceHistory.objects.filter(account_id=account_id)
+
+    previous = snapshots.filter(date__lt=date).order_by('-date').values_list('balance', flat=True).first()
+    if previous is not None:
+        return previous
+
+    following = snapshots.filter(date__gt=date).order_by('date').values('date', 'balance').first()
+    if following is None:
+        return current_balance
+
+    # The rows being applied are already written but not yet reflected in the snapshots, so
+    # their delta on that day is taken back out of the day's net.
+    return following['balance'] - day_net(account_id, following['date']) + (deltas or {}).get(following['date'], 0)
+
+
+def balances_at(account_ids, dates):
+    # Each snapshot falls in the bucket of the first requested date on or after it, so the latest
+    # snapshot per (account, bucket) is the balance at that date: one window query however many
+    # dates are asked for. Dates with no snapshot in their bucket carry the previous balance, and
+    # dates before an account's first snapshot fall back as Account.get_balance_at_date does.
+    dates = sorted(set(dates))
+    balances = {date: {} for date in dates}
+    starting = {
+        account_id: balance if opening_balance is None else opening_balance
+        for account_id, balance, opening_balance in Account.objects.filter(id__in=account_ids)
+        .values_list('id', 'balance', 'opening_balance')
+    }
+    if not dates or not starting:
+        return balances
+
+    bucket = Case(*[When(date__lte=date, then=Value(index)) for index, date in enumerate(dates)],
+                  output_field=IntegerField())
+    latest = (
+        BalanceHistory.objects.filter(account_id__in=starting, date__lte=dates[-1])
+        .annotate(bucket=bucket, rank=Window(RowNumber(), partition_by=[F('account_id'), bucket],
+                                             order_by=F('date').desc()))
+        .filter(rank=1)
+        .values_list('account_id', 'bucket', 'balance')
+    )
+    closing = {(account_id, index): balance for account_id, index, balance in latest}
+
+    for account_id, balance in starting.items():
+        for index, date in enumerate(dates):
+            balance = closing.get((account_id, index), balance)
+            balances[date][account_id] = balance
+    return balances
+
+
+def apply_balance_deltas(account_id, deltas):
+    deltas = {date: delta for date, delta in deltas.items() if delta}
+    if not deltas:
+        return None
+    dates = sorted(deltas)
+
+    with db_transaction.atomic():
+        current_balance = Account.objects.select_for_update().values_list('balance', flat=True).get(pk=account_id)
+
+        # Days without a snapshot get one holding the balance carried into that day (read from the
+        # closest earlier snapshot, before anything is shifted), so the single UPDATE below moves
+        # them together with every existing snapshot on or after the first affected day.
+        snapshots = dict(
+            BalanceHistory.objects.filter(account_id=account_id, date__gte=dates[0], date__lte=dates[-1])
+            .values_list('date', 'balance')
+        )
+        earlier = iter(sorted(snapshots.items()))
+        upcoming = next(earlier, None)
+        carried = None
+        missing = []
+        for date in dates:
+            while upcoming and upcoming[0] < date:
+                carried = upcoming[1]
+                upcoming = next(earlier, None)
+            if date in snapshots:
+                continue
+            if carried is None:
+                carried = balance_before(account_id, date, current_balance, deltas)
+            missing.append(BalanceHistory(account_id=account_id, date=date, balance=carried))
+        BalanceHistory.objects.bulk_create(missing, ignore_conflicts=True)
+
+        shifts = []
+        total = Decimal(0)
+        for date in dates:
+            total += deltas[date]
+            shifts.append(When(date__gte=date, then=Value(total)))
+        BalanceHistory.objects.filter(account_id=account_id, date__gte=dates[0]).update(
+            balance=F('balance') + Case(*reversed(shifts), output_field=DecimalField())
+        )
+        if total:
+            Account.objects.filter(pk=account_id).update(balance=F('balance') + total)
+
+    return current_balance + total
+
+
+def balance_deltas(added=(), removed=()):
+    deltas = defaultdict(lambda: defaultdict(Decimal))
+    for transactions, sign in ((added, 1), (removed, -1)):
+        for transaction in transactions:
+            deltas[transaction.account_id][transaction.date] += sign * signed_amount(
+                transaction.transaction_type, transaction.amount
+            )
+    return deltas
+
+
+def record_balances(added=(), removed=()):
+    # Expects the rows to be written (or deleted) already; accounts are locked in id order.
+    deltas = balance_deltas(added, removed)
+    balances = {}
+    for account_id in sorted(deltas):
+        balance = apply_balance_deltas(account_id, deltas[account_id])
+        if balance is not None:
+            balances[account_id] = balance
+    return balances
+
+
+def goal_deltas(added=(), removed=()):
+    deltas = defaultdict(Decimal)
+    for transactions, sign in ((added, 1), (removed, -1)):
+        for transaction in transactions:
+            deltas[(transaction.budget_id, transaction.date)] += sign * signed_amount(
+                transaction.transaction_type, transaction.amount
+            )
+    return deltas
+
+
+def apply_goal_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    if len(deltas) <= GOAL_WINDOW_CASE_LIMIT:
+        # A single UPDATE: each (budget, date) adds its delta to the goals whose window covers
+        # that date, and goals outside every window are never touched.
+        windows = [Q(budget_id=budget_id, start_date__lte=date, end_date__gte=date) for budget_id, date in deltas]
+        shift = F('current_balance')
+        for window, delta in zip(windows, deltas.values()):
+            shift = shift + Case(When(window, then=Value(delta)), default=Value(Decimal(0)), output_field=DecimalField())
+        BudgetGoal.objects.filter(reduce(operator.or_, windows)).update(current_balance=shift)
+        return
+
+    # Bulk writes span too many days for one CASE per day, so the shift of each goal is worked
+    # out from the goals' windows and applied with one CASE per goal instead.
+    by_budget = defaultdict(list)
+    for (budget_id, date), delta in deltas.items():
+        by_budget[budget_id].append((date, delta))
+
+    goal_shifts = {}
+    goals = BudgetGoal.objects.filter(budget_id__in=by_budget).values_list('id', 'budget_id', 'start_date', 'end_date')
+    for goal_id, budget_id, start_date, end_date in goals:
+        shift = sum((delta for date, delta in by_budget[budget_id] if start_date <= date <= end_date), Decimal(0))
+        if shift:
+            goal_shifts[goal_id] = shift
+
+    if goal_shifts:
+        BudgetGoal.objects.filter(id__in=goal_shifts).update(current_balance=F('current_balance') + Case(
+            *[When(id=goal_id, then=Value(shift)) for goal_id, shift in goal_shifts.items()],
+            output_field=DecimalField()
+        ))
+
+
+def record_goal_progress(added=(), removed=()):
+    apply_goal_deltas(goal_deltas(added, removed))
+
+
+def create_transactions(transactions, batch_size=1000):
+    from .rollups import record_rollups
+
+    with db_transaction.atomic():
+        created = Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        record_balances(added=created)
+        record_goal_progress(added=created)
+        record_rollups(added=created)
+        bump_transaction_owners(created)
+
+    return created
+
+
+def account_transactions(account_id, start_date=None, end_date=None):
+    transactions = Transaction.objects.filter(account_id=account_id)
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lt=end_date)
+    return transactions
+
+
+def transaction_net(account_id, start_date=None, end_date=None):
+    totals = account_transactions(account_id, start_date, end_date).aggregate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expense=Sum('amount', filter=Q(transaction_type='expense')),
+    )
+    return (totals['income'] or 0) - (totals['expense'] or 0)
+
+
+def daily_nets(account_id, start_date=None, end_date=None):
+    return (
+        account_transactions(account_id, start_date, end_date)
+        .values('date')
+        .annotate(
+            income=Sum('amount', filter=Q(transaction_type='income')),
+            expense=Sum('amount', filter=Q(transaction_type='expense')),
+        )
+        .order_by('date')
+    )
+
+
+def derive_opening_balance(account_id, current_balance):
+    # The current balance carries whatever drift a rebuild is meant to correct, so it is only the
+    # starting point for accounts that have never had a snapshot written.
+    snapshots = BalanceHistory.objects.filter(account_id=account_id)
+    first = snapshots.order_by('date', '-id').values('date', 'balance').first()
+    if first is None:
+        return current_balance - transaction_net(account_id)
+    return first['balance'] - transaction_net(account_id, end_date=first['date'] + timedelta(days=1))
+
+
+def rebuild_account_ledger(account_id, since=None, dry_run=False, chunk_size=2000):
+    with db_transaction.atomic():
+        account = Account.objects.select_for_update().values(
+            'balance', 'opening_balance', 'user_id', 'family_id'
+        ).get(pk=account_id)
+        opening_balance = account['opening_balance']
+        if opening_balance is None:
+            opening_balance = derive_opening_balance(account_id, account['balance'])
+
+        balance = opening_balance
+        if since:
+            balance += transaction_net(account_id, end_date=since)
+
+        snapshots = BalanceHistory.objects.filter(account_id=account_id)
+        if since:
+            snapshots = snapshots.filter(date__gte=since)
+        existing = {snapshot.date: snapshot for snapshot in snapshots.only('id', 'date', 'balance')}
+
+        # One pass over the account's days in date order (streamed from a server-side cursor);
+        # snapshots on days without transactions are kept and set to the balance carried into them.
+        to_create = []
+        to_update = []
+        days = iter(daily_nets(account_id, start_date=since).iterator(chunk_size=chunk_size))
+        day = next(days, None)
+        stale = iter(sorted(existing))
+        stale_date = next(stale, None)
+        while day or stale_date:
+            if day and (stale_date is None or day['date'] <= stale_date):
+                balance += (day['income'] or 0) - (day['expense'] or 0)
+                date = day['date']
+                day = next(days, None)
+            else:
+                date = stale_date
+            if stale_date == date:
+                stale_date = next(stale, None)
+
+            snapshot = existing.get(date)
+            if snapshot is None:
+                to_create.append(BalanceHistory(account_id=account_id, date=date, balance=balance))
+            elif snapshot.balance != balance:
+                snapshot.balance = balance
+                to_update.append(snapshot)
+
+        changed = account['balance'] != balance
+        if not dry_run:
+            BalanceHistory.objects.bulk_create(to_create, batch_size=chunk_size)
+            BalanceHistory.objects.bulk_update(to_update, ['balance'], batch_size=chunk_size)
+            Account.objects.filter(pk=account_id).update(balance=balance, opening_balance=opening_balance)
+            if to_create or to_update or changed:
+                bump_generations(user_ids=[account['user_id']], family_ids=[account['family_id']])
+
+    return {
+        'account_id': account_id,
+        'created': len(to_create),
+        'updated': len(to_update),
+        'old_balance': account['balance'],
+        'balance': balance,
+        'changed': changed,
+    }
+
+
+def compact_balance_history(balance_history_model, account_ids, batch_size=500):
+    removed = 0
+    for start in range(0, len(account_ids), batch_size):
+        batch = account_ids[start:start + batch_size]
+        with db_transaction.atomic():
+            snapshots = balance_history_model.objects.filter(account_id__in=batch)
+            keep = snapshots.values('account_id', 'date').annotate(keep_id=Max('id')).values('keep_id')
+            deleted, _ = snapshots.exclude(id__in=keep).delete()
+        removed += deleted
+    return removed
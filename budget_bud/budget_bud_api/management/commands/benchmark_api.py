@@ -0,0 +1,72 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from ...benchmarks import run_benchmarks, find_regressions, load_baseline, save_baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'benchmark_baseline.json')
+
+
+class Command(BaseCommand):
+    help = ("Seeds benchmark datasets in a throwaway test database, measures query count, time and peak memory "
+            "for each API route, and fails on routes over their query budget or regressions against a stored "
+            "baseline")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000',
+                            help="Comma-separated transaction counts for the benchmarked user, e.g. 100,10000,100000")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Timed requests per route; the median is reported")
+        parser.add_argument('--route', action='append', dest='routes',
+                            help="Only benchmark this route (may be repeated)")
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                            help="Baseline JSON file to compare against")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Write the results to the baseline file instead of comparing")
+        parser.add_argument('--output', default=None,
+                            help="Also write the results to this JSON file")
+        parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help="Allowed slowdown over the baseline, as a fraction")
+        parser.add_argument('--memory-tolerance', type=float, default=0.5,
+                            help="Allowed peak memory growth over the baseline, as a fraction")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',')})
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+
+        self.stdout.write(f"Benchmarking API routes at {', '.join(map(str, sizes))} transactions...")
+        results = run_benchmarks(sizes, repeat=options['repeat'], routes=options['routes'])
+
+        self.stdout.write(f"{'route':<50} {'status':>6} {'queries':>8} {'ms':>10} {'peak KiB':>10}")
+        for key, measurement in sorted(results.items(), key=lambda item: (int(item[0].split(':')[0]), item[0])):
+            self.stdout.write(
+                f"{key:<50} {measurement['status']:>6} {measurement['queries']:>8} "
+                f"{measurement['time_ms']:>10} {measurement['peak_kb']:>10}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+
+        if options['update_baseline']:
+            save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}."))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --update-baseline to record one.")
+            baseline = {}
+
+        regressions = find_regressions(
+            results, baseline,
+            time_tolerance=options['time_tolerance'],
+            memory_tolerance=options['memory_tolerance'],
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"{len(regressions)} performance regressions found.")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} measurements within the baseline."))
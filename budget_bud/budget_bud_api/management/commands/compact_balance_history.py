@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ...ledger import compact_balance_history
+from ...models import Account, BalanceHistory
+
+
+class Command(BaseCommand):
+    help = "Collapses duplicate BalanceHistory rows to one snapshot per account per day"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of accounts compacted per database transaction")
+
+    def handle(self, *args, **options):
+        account_ids = list(Account.objects.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f"Compacting balance history for {len(account_ids)} accounts...")
+        removed = compact_balance_history(BalanceHistory, account_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} duplicate snapshots."))
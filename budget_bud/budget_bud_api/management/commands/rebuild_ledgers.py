@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from ...ledger import rebuild_account_ledger
+from ...models import Account
+
+
+def init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def rebuild_account(arguments):
+    return rebuild_account_ledger(*arguments)
+
+
+class Command(BaseCommand):
+    help = "Recomputes Account.balance and BalanceHistory from each account's transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only rebuild this account (may be repeated)")
+        parser.add_argument('--since', default=None,
+                            help="Only rewrite snapshots from this date (YYYY-MM-DD) onwards")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report what would change without writing anything")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Number of worker processes; 1 rebuilds in this process")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched and written per batch")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        accounts = Account.objects.order_by('id')
+        if options['accounts']:
+            accounts = accounts.filter(id__in=options['accounts'])
+        account_ids = list(accounts.values_list('id', flat=True))
+
+        arguments = [(account_id, since, options['dry_run'], options['chunk_size']) for account_id in account_ids]
+        self.stdout.write(f"Rebuilding ledgers for {len(account_ids)} accounts...")
+
+        if options['workers'] > 1 and len(account_ids) > 1:
+            # Workers open their own connections; none may be inherited from this process.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as executor:
+                results = list(executor.map(rebuild_account, arguments, chunksize=16))
+        else:
+            results = [rebuild_account(argument) for argument in arguments]
+
+        created = updated = changed = 0
+        for result in results:
+            created += result['created']
+            updated += result['updated']
+            if result['changed']:
+                changed += 1
+                self.stdout.write(
+                    f"Account {result['account_id']}: balance {result['old_balance']} -> {result['balance']}"
+                )
+
+        verb = "Would write" if options['dry_run'] else "Wrote"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {created} new and {updated} corrected snapshots; {changed} account balances changed."
+        ))
@@ -0,0 +1,22 @@
+def family_memberships(request):
+    # Every family the requesting user belongs to and every user sharing one of them, resolved in one
+    # query and kept on the underlying HttpRequest so each view and helper handling the same request
+    # reuses it.
+    from .models import Family
+
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, 'family_memberships'):
+        rows = Family.members.through.objects.filter(family__members=request.user).values_list('family_id', 'user_id')
+        http_request.family_memberships = (
+            tuple(sorted({family_id for family_id, _ in rows})),
+            {user_id for _, user_id in rows},
+        )
+    return http_request.family_memberships
+
+
+def family_ids(request):
+    return family_memberships(request)[0]
+
+
+def family_member_ids(request):
+    return family_memberships(request)[1]
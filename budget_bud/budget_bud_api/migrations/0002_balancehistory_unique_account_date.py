@@ -0,0 +1,37 @@
+from django.db import migrations, models, transaction
+from django.db.models import Max
+
+BATCH_SIZE = 500
+
+
+def compact_duplicate_snapshots(apps, schema_editor):
+    # Kept self-contained rather than calling ledger.compact_balance_history, so later changes to the
+    # app code cannot alter what this migration does.
+    Account = apps.get_model('budget_bud_api', 'Account')
+    BalanceHistory = apps.get_model('budget_bud_api', 'BalanceHistory')
+    using = schema_editor.connection.alias
+
+    account_ids = list(Account.objects.using(using).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(account_ids), BATCH_SIZE):
+        with transaction.atomic(using=using):
+            snapshots = BalanceHistory.objects.using(using).filter(account_id__in=account_ids[start:start + BATCH_SIZE])
+            keep = snapshots.values('account_id', 'date').annotate(keep_id=Max('id')).values('keep_id')
+            snapshots.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+    # Not atomic, so each batch of accounts commits (and releases its row locks) on its own instead of
+    # every delete being held until the whole migration finishes.
+    atomic = False
+
+    dependencies = [
+        ('budget_bud_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='balancehistory',
+            constraint=models.UniqueConstraint(fields=('account', 'date'), name='unique_balance_history_account_date'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+BATCH_SIZE = 2000
+
+
+def backfill_monthly_rollups(apps, schema_editor):
+    Transaction = apps.get_model('budget_bud_api', 'Transaction')
+    MonthlyRollup = apps.get_model('budget_bud_api', 'MonthlyRollup')
+    grouped = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'user_id', 'family_id', 'category_id', 'budget_id', 'account_id', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+    batch = []
+    for entry in grouped.iterator(chunk_size=BATCH_SIZE):
+        batch.append(MonthlyRollup(**entry))
+        if len(batch) >= BATCH_SIZE:
+            MonthlyRollup.objects.bulk_create(batch)
+            batch = []
+    MonthlyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_bud_api', '0002_balancehistory_unique_account_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=7)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='budget_bud_api.account')),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='budget_bud_api.budget')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='budget_bud_api.category')),
+                ('family', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='budget_bud_api.family')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(models.F('user'), django.db.models.functions.comparison.Coalesce('family', 0), models.F('month'), models.F('category'), models.F('budget'), models.F('account'), models.F('transaction_type'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_monthly_rollups, migrations.RunPython.noop),
+    ]
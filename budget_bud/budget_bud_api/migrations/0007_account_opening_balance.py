@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import F, Q, Sum, Subquery, OuterRef, DecimalField
+from django.db.models.functions import Coalesce
+
+
+def backfill_opening_balances(apps, schema_editor):
+    Account = apps.get_model('budget_bud_api', 'Account')
+    BalanceHistory = apps.get_model('budget_bud_api', 'BalanceHistory')
+    Transaction = apps.get_model('budget_bud_api', 'Transaction')
+
+    def net(transactions):
+        return Subquery(
+            transactions
+            .values('account')
+            .annotate(net=Coalesce(Sum('amount', filter=Q(transaction_type='income')), 0, output_field=DecimalField())
+                      - Coalesce(Sum('amount', filter=Q(transaction_type='expense')), 0, output_field=DecimalField()))
+            .values('net'),
+            output_field=DecimalField(),
+        )
+
+    # Accounts with history start from their earliest snapshot, less everything posted up to and
+    # including that day; the drifting current balance is only used for accounts without one.
+    first_snapshot = BalanceHistory.objects.filter(account=OuterRef('pk')).order_by('date', '-id')
+    first_snapshot_date = (
+        BalanceHistory.objects.filter(account=OuterRef(OuterRef('pk'))).order_by('date').values('date')[:1]
+    )
+    net_to_first_snapshot = net(
+        Transaction.objects.filter(account=OuterRef('pk'), date__lte=Subquery(first_snapshot_date))
+    )
+    net_to_date = net(Transaction.objects.filter(account=OuterRef('pk')))
+    Account.objects.update(opening_balance=Coalesce(
+        Subquery(first_snapshot.values('balance')[:1], output_field=DecimalField())
+        - Coalesce(net_to_first_snapshot, 0, output_field=DecimalField()),
+        F('balance') - Coalesce(net_to_date, 0, output_field=DecimalField()),
+        output_field=DecimalField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_bud_api', '0006_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_opening_balances, migrations.RunPython.noop),
+    ]
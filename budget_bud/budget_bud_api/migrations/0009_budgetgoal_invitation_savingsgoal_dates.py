@@ -0,0 +1,61 @@
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_savings_goal_dates(apps, schema_editor):
+    # Goals created before they had a window are given the day they were set as both ends.
+    SavingsGoal = apps.get_model('budget_bud_api', 'SavingsGoal')
+    SavingsGoal.objects.update(start_date=F('date_set'), end_date=F('date_set'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_bud_api', '0008_report_cache_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savingsgoal',
+            name='end_date',
+            field=models.DateField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='savingsgoal',
+            name='start_date',
+            field=models.DateField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_savings_goal_dates, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='BudgetGoal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('current_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('goal_met', models.BooleanField(default=False)),
+                ('date_set', models.DateField(default=django.utils.timezone.now)),
+                ('alert_sent', models.BooleanField(default=False)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_goals', to='budget_bud_api.budget')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Invitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('token', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -1,10 +1,29 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
-from django.db.models import Sum
 from django.utils import timezone
-from decimal import Decimal
+from datetime import timedelta
+import calendar
 import uuid
-from .utils import SendEmail
+
+
+def add_months(value, months, day=None):
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(day or value.day, calendar.monthrange(year, month)[1]))
+
+
+def next_occurrence_after(value, recurring_type, anchor_day=None):
+    if recurring_type == 'daily':
+        return value + timedelta(days=1)
+    elif recurring_type == 'weekly':
+        return value + timedelta(weeks=1)
+    elif recurring_type == 'monthly':
+        return add_months(value, 1, anchor_day)
+    elif recurring_type == 'yearly':
+        return add_months(value, 12, anchor_day)
+    return None
 
 
 class Family(models.Model):
@@ -50,50 +69,6 @@ class BudgetGoal(models.Model):
     date_set = models.DateField(default=timezone.now)
     alert_sent = models.BooleanField(default=False)
 
-    def update_goal_progress(self, amount):
-        self.current_balance += amount
-        self.save()
-
-    def check_goal_met(self):
-        if self.budget.balance >= self.target_balance and not self.goal_met:
-            self.goal_met = True
-            self.save()
-            self.send_alert()
-        else:
-            self.send_alert()
-
-    def send_alert(self):
-        if not self.alert_sent:
-            if self.current_balance < self.target_balance:
-                over_amount = self.target_balance - self.current_balance
-                data = {
-                    "username": self.budget.user.username,
-                    "budget": self.budget.name,
-                    "over_amount": over_amount
-                }
-                email_service = SendEmail()
-                try:
-                    email_service.send_mail(recipient=self.budget.user.email, message_type="BudgetGoalFailed", data=data)
-                    self.alert_sent = True
-                    self.save()
-                except Exception as e:
-                    print(f"Error sending alert: {e}")
-            else:
-                amount_saved = self.current_balance - self.target_balance
-                data = {
-                    "username": self.budget.user.username,
-                    "budget": self.budget.name,
-                    "amount_saved": amount_saved
-                }
-                email_service = SendEmail()
-                try:
-                    email_service.send_mail(recipient=self.budget.user.email, message_type="BudgetGoal", data=data)
-                    self.alert_sent = True
-                    self.save()
-                except Exception as e:
-                    print(f"Error sending alert: {e}")
-
-
 
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
@@ -125,97 +100,64 @@ class Transaction(models.Model):
     def __str__(self):
         return f"{self.transaction_type.title()} - {self.amount}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='transaction_user_date_idx'),
+            models.Index(fields=['family', 'date'], name='transaction_family_date_idx'),
+            models.Index(fields=['account', 'date'], name='transaction_account_date_idx'),
+            models.Index(fields=['budget', 'date'], name='transaction_budget_date_idx'),
+            models.Index(fields=['category', 'date'], name='transaction_category_date_idx'),
+            models.Index(fields=['next_occurrence'], name='transaction_recurring_due_idx',
+                         condition=models.Q(is_recurring=True)),
+        ]
+
     def save(self, *args, **kwargs):
         if self.is_recurring and self.next_occurrence is None:
-            if self.recurring_type == 'daily':
-                self.next_occurrence = self.date + timezone.timedelta(days=1)
-            elif self.recurring_type == 'weekly':
-                self.next_occurrence = self.date + timezone.timedelta(weeks=1)
-            elif self.recurring_type == 'monthly':
-                self.next_occurrence = self.date + timezone.relativedelta.relativedelta(months=1)
-            elif self.recurring_type == 'yearly':
-                self.next_occurrence = self.date + timezone.relativedelta.relativedelta(years=1)
-            else:
-                self.next_occurrence = None
-        super().save(*args, **kwargs)
+            self.next_occurrence = next_occurrence_after(self.date, self.recurring_type)
+
+        previous = None
+        if not self._state.adding and self.pk:
+            previous = Transaction.objects.filter(pk=self.pk).first()
+
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            self.record_ledger_change(previous)
 
-        budget = self.budget
-        budget_goals = budget.budget_goals.all()
-        if budget_goals.exists():
-            for goal in budget_goals:
-                if goal.budget == budget:
-                    if self.transaction_type == 'income':
-                        goal.update_goal_progress(Decimal(self.amount))
-                        goal.save()
-                    elif self.transaction_type == 'expense':
-                        goal.update_goal_progress(-Decimal(self.amount))
-                        goal.save()
-        account = self.account
-        self.adjust_balance_history(account)
-
-    def adjust_balance_history(self, account):
-
-        current_balance = account.balance
-        future_transactions = Transaction.objects.filter(account=account, date__gte=self.date).order_by('date')
-
-        if future_transactions:
-            future_expense = Transaction.objects.filter(account=account, date__gte=self.date, transaction_type='expense').aggregate(total=Sum('amount'))
-            future_income = Transaction.objects.filter(account=account, date__gte=self.date, transaction_type='income').aggregate(total=Sum('amount'))
-
-            expense_total = future_expense['total'] if future_expense['total'] is not None else 0
-            income_total = future_income['total'] if future_income['total'] is not None else 0
-
-            current_balance += expense_total - income_total
-            if self.transaction_type == 'income':
-                current_balance += self.amount
-            elif self.transaction_type == 'expense':
-                current_balance -= self.amount
-
-            BalanceHistory.objects.create(account=account, balance=current_balance, date=self.date)
-
-            for transaction in future_transactions:
-                if transaction.transaction_type == 'income':
-                    current_balance += transaction.amount
-                    entries = BalanceHistory.objects.filter(date=transaction.date, account=account)
-                    for entry in entries:
-                        entry.balance = current_balance
-                        entry.save()
-                elif transaction.transaction_type == 'expense':
-                    current_balance -= transaction.amount
-                    entries = BalanceHistory.objects.filter(date=transaction.date, account=account)
-                    for entry in entries:
-                        entry.balance = current_balance
-                        entry.save()
-
-                account.balance = current_balance
-                account.save()
-
-        else:
-            if self.transaction_type == 'income':
-                current_balance = account.balance + self.amount
-            elif self.transaction_type == 'expense':
-                current_balance = account.balance - self.amount
-
-            BalanceHistory.objects.create(account=account, balance=current_balance, date=self.date)
-            account.balance = current_balance
-            account.save()
+    def record_ledger_change(self, previous=None):
+        from .cache import bump_transaction_owners
+        from .ledger import record_balances, record_goal_progress
+        from .rollups import record_rollups
+
+        removed = [previous] if previous else []
+        balances = record_balances(added=[self], removed=removed)
+        if Transaction.account.is_cached(self) and self.account_id in balances:
+            self.account.balance = balances[self.account_id]
+        record_rollups(added=[self], removed=removed)
+        record_goal_progress(added=[self], removed=removed)
+        bump_transaction_owners([self, previous])
 
 
 class Account(models.Model):
     name = models.CharField(max_length=100)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    opening_balance = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='accounts')
     family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name='accounts', null=True, blank=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.opening_balance is None:
+            self.opening_balance = self.balance
+        super().save(*args, **kwargs)
+
     def get_balance_at_date(self, date):
         try:
-            balance_history = self.balancehistory_set.filter(date__lte=date).latest('date')
+            balance_history = self.balance_history.filter(date__lte=date).latest('date')
             return balance_history.balance
         except BalanceHistory.DoesNotExist:
-            return self.balance
+            return self.balance if self.opening_balance is None else self.opening_balance
 
 
 class BalanceHistory(models.Model):
@@ -228,6 +170,34 @@ class BalanceHistory(models.Model):
 
     class Meta:
         ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='unique_balance_history_account_date'),
+        ]
+
+
+class MonthlyRollup(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name='monthly_rollups', null=True, blank=True)
+    month = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='monthly_rollups')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='monthly_rollups')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_rollups')
+    transaction_type = models.CharField(max_length=7, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} {self.transaction_type} - {self.total}'
+
+    class Meta:
+        constraints = [
+            # family is nullable, and NULLs never collide in a plain unique index; coalescing it to 0
+            # makes personal rollups unique too, on every backend.
+            models.UniqueConstraint(
+                'user', Coalesce('family', 0), 'month', 'category', 'budget', 'account', 'transaction_type',
+                name='unique_monthly_rollup',
+            ),
+        ]
 
 
 class SavingsGoal(models.Model):
@@ -240,44 +210,6 @@ class SavingsGoal(models.Model):
     date_set = models.DateField(default=timezone.now)
     alert_sent = models.BooleanField(default=False)
 
-    def check_goal_met(self):
-        if self.account.balance >= self.target_balance and not self.goal_met:
-            self.goal_met = True
-            self.save()
-            self.send_alert()
-        else:
-            self.send_alert()
-
-    def send_alert(self):
-        if not self.alert_sent:
-            if self.current_balance < self.target_balance:
-                over_amount = self.target_balance - self.current_balance
-                data = {
-                    "username": self.account.user.username,
-                    "account": self.account.name,
-                    "over_amount": over_amount
-                }
-                email_service = SendEmail()
-                try:
-                    email_service.send_mail(recipient=self.account.user.email, message_type="SavingsGoalFailed", data=data)
-                    self.alert_sent = True
-                    self.save()
-                except Exception as e:
-                    print(f"Error sending alert: {e}")
-            else:
-                amount_saved = self.current_balance - self.target_balance
-                data = {
-                    "username": self.account.user.username,
-                    "account": self.account.name,
-                    "amount_saved": amount_saved
-                }
-                email_service = SendEmail()
-                try:
-                    email_service.send_mail(recipient=self.account.user.email, message_type="SavingsGoal", data=data)
-                    self.alert_sent = True
-                    self.save()
-                except Exception as e:
-                    print(f"Error sending alert: {e}")
 
 class Report(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -303,4 +235,33 @@ class ReportDashboard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_dashboards')
     report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='dashboards')
     x_size = models.CharField(max_length=6, choices=X_SIZES)
-    y_size = models.CharField(max_length=6, choices=Y_SIZES)
\ No newline at end of file
+    y_size = models.CharField(max_length=6, choices=Y_SIZES)
+
+class OutboundEmail(models.Model):
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    recipient = models.EmailField()
+    from_email = models.CharField(max_length=254, blank=True)
+    message_type = models.CharField(max_length=50, blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    subject = models.CharField(max_length=255, blank=True)
+    text_body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=7, choices=STATUSES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.subject or self.message_type} to {self.recipient} ({self.status})'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
@@ -0,0 +1,90 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import OutboundEmail
+from .utils import SendEmail
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def build_message(email, connection):
+    subject, text_body, html_body = email.subject, email.text_body, email.html_body
+    if email.message_type:
+        subject, text_body, html_body = SendEmail().render(email.message_type, email.context)
+
+    message = EmailMultiAlternatives(subject, text_body, email.from_email or None,
+                                     [email.recipient], connection=connection)
+    if html_body:
+        message.attach_alternative(html_body, "text/html")
+    return message
+
+
+def claim_batch(batch_size):
+    # Rows are leased by pushing next_attempt_at past the longest the batch can take to send, which
+    # keeps other workers off them without holding a transaction or row locks during SMTP. If this
+    # worker dies mid-batch, the unsent rows become due again once the lease runs out.
+    lease = timedelta(seconds=settings.EMAIL_TIMEOUT * batch_size)
+    with db_transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .filter(status='pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(
+            attempts=F('attempts') + 1, next_attempt_at=timezone.now() + lease
+        )
+
+    for email in batch:
+        email.attempts += 1
+    return batch
+
+
+def deliver_outbox(batch_size=100, max_attempts=5):
+    sent = failed = 0
+    connection = get_connection()
+
+    try:
+        while True:
+            # Failures are rescheduled past now, so a batch is never claimed twice in one run.
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+
+            for email in batch:
+                try:
+                    # open() is a no-op while the connection is up, so the whole run goes over one
+                    # SMTP session unless a failure forced it closed.
+                    connection.open()
+                    connection.send_messages([build_message(email, connection)])
+                except Exception as e:
+                    logger.warning(f"Failed to send email {email.id}: {str(e)}")
+                    email.last_error = str(e)
+                    if email.attempts >= max_attempts:
+                        email.status = 'failed'
+                        failed += 1
+                    else:
+                        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    connection.close()
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+
+            OutboundEmail.objects.bulk_update(batch, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+    finally:
+        connection.close()
+
+    return sent, failed
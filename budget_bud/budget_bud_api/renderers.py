@@ -1,21 +1,14 @@
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
 from decimal import Decimal
 
 
-class CustomJSONRenderer(JSONRenderer):
-    def render(self, data, accepted_media_type=None, renderer_context=None):
-        def format_decimal(value):
-            if isinstance(value, Decimal):
-                return f"{value:.2f}"
-            return value
+class DecimalJSONEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return f"{obj:.2f}"
+        return super().default(obj)
 
-        def recursive_format(data):
-            if isinstance(data, dict):
-                return {key: recursive_format(value) for key, value in data.items()}
-            elif isinstance(data, list):
-                return [recursive_format(item) for item in data]
-            else:
-                return format_decimal(data)
 
-        data = recursive_format(data)
-        return super().render(data, accepted_media_type, renderer_context)
\ No newline at end of file
+class CustomJSONRenderer(JSONRenderer):
+    encoder_class = DecimalJSONEncoder
@@ -0,0 +1,227 @@
+import csv
+import json
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import letter, landscape
+
+
+class ReportColumn:
+    def __init__(self, name, header, key, max_length=None):
+        self.name = name
+        self.header = header
+        self.key = key
+        self.max_length = max_length
+
+    def value(self, entry):
+        return entry[self.key]
+
+    def format(self, entry):
+        value = self.value(entry)
+        if value is None:
+            return "N/A"
+        value = str(value)
+        if self.max_length:
+            value = value[:self.max_length]
+        return value
+
+
+class PDFPage:
+    def __init__(self):
+        self.operations = []
+        self.font_size = 12
+
+    def set_font_size(self, size):
+        self.font_size = size
+
+    def draw_string(self, x, y, text):
+        text = ''.join(char if char.isprintable() else ' ' for char in text)
+        text = text.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        self.operations.append(b"BT /F1 %d Tf %d %d Td (%s) Tj ET\n" % (self.font_size, x, y, text))
+
+    def content(self):
+        return b"".join(self.operations)
+
+
+class PDFStreamWriter:
+    # Objects 1-3 are the catalog, the page tree and the Helvetica font. The page tree is only
+    # written at the end, once every page has been emitted and its object number is known.
+    catalog_id = 1
+    pages_id = 2
+    font_id = 3
+
+    def __init__(self, page_size):
+        self.page_width, self.page_height = page_size
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4
+
+    def emit(self, data):
+        self.position += len(data)
+        return data
+
+    def object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        return self.emit(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+
+    def header(self):
+        return (
+            self.emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            + self.object(self.font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                        b"/Encoding /WinAnsiEncoding >>")
+        )
+
+    def page(self, page):
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+
+        stream = zlib.compress(page.content())
+        return (
+            self.object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+                        % (len(stream), stream))
+            + self.object(page_id, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                                   b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                          % (self.pages_id, self.page_width, self.page_height, self.font_id, content_id))
+        )
+
+    def trailer(self):
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        data = (
+            self.object(self.pages_id, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+            + self.object(self.catalog_id, b"<< /Type /Catalog /Pages %d 0 R >>" % self.pages_id)
+        )
+
+        xref_position = self.position
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id]
+        for object_id in range(1, self.next_id):
+            xref.append(b"%010d 00000 n \n" % self.offsets[object_id])
+        xref.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self.next_id, self.catalog_id, xref_position))
+        return data + self.emit(b"".join(xref))
+
+
+class PDFReport:
+    page_size = landscape(letter)
+    margin_left = 30
+    margin_top = 550
+    margin_bottom = 100
+    column_width = 70
+    line_height = 20
+    chunk_size = 2000
+
+    def __init__(self, title, columns, filename):
+        self.title = title
+        self.columns = columns
+        self.filename = filename
+
+    def draw_headers(self, page, y_position):
+        for index, column in enumerate(self.columns):
+            page.draw_string(self.margin_left + (index * self.column_width), y_position, column.header)
+        return y_position - self.line_height
+
+    def stream(self, rows):
+        writer = PDFStreamWriter(self.page_size)
+        yield writer.header()
+
+        page = PDFPage()
+        page.set_font_size(16)
+        page.draw_string(self.margin_left + 100, self.margin_top, self.title)
+        page.set_font_size(12)
+        y_position = self.draw_headers(page, self.margin_top - 30)
+
+        for entry in rows:
+            for index, column in enumerate(self.columns):
+                page.draw_string(self.margin_left + (index * self.column_width), y_position, column.format(entry))
+
+            y_position -= self.line_height
+
+            if y_position < self.margin_bottom:
+                yield writer.page(page)
+                page = PDFPage()
+                y_position = self.draw_headers(page, self.margin_top)
+
+        yield writer.page(page)
+        yield writer.trailer()
+
+    def response(self, queryset):
+        response = StreamingHttpResponse(
+            self.stream(queryset.iterator(chunk_size=self.chunk_size)),
+            content_type='application/pdf'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+        return response
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
+
+class RowReport:
+    content_type = None
+    chunk_size = 2000
+    rows_per_write = 500
+
+    def __init__(self, columns, filename):
+        self.columns = columns
+        self.filename = filename
+
+    def header(self):
+        return ''
+
+    def format_row(self, entry):
+        raise NotImplementedError
+
+    def stream(self, rows):
+        lines = [self.header()]
+        for entry in rows:
+            lines.append(self.format_row(entry))
+            if len(lines) >= self.rows_per_write:
+                yield ''.join(lines)
+                lines = []
+        yield ''.join(lines)
+
+    def response(self, queryset):
+        response = StreamingHttpResponse(
+            self.stream(queryset.iterator(chunk_size=self.chunk_size)),
+            content_type=self.content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+        return response
+
+
+class CSVReport(RowReport):
+    content_type = 'text/csv'
+
+    def __init__(self, columns, filename):
+        super().__init__(columns, filename)
+        self.writer = csv.writer(EchoBuffer())
+
+    def header(self):
+        return self.writer.writerow([column.name for column in self.columns])
+
+    def format_row(self, entry):
+        return self.writer.writerow([column.value(entry) for column in self.columns])
+
+
+class NDJSONReport(RowReport):
+    content_type = 'application/x-ndjson'
+
+    def format_row(self, entry):
+        row = {column.name: column.value(entry) for column in self.columns}
+        return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+REPORT_FORMATS = ('pdf', 'csv', 'ndjson')
+
+
+def report_response(report_format, queryset, columns, title, filename):
+    if report_format == 'pdf':
+        return PDFReport(title, columns, f"{filename}.pdf").response(queryset)
+    elif report_format == 'csv':
+        return CSVReport(columns, f"{filename}.csv").response(queryset)
+    elif report_format == 'ndjson':
+        return NDJSONReport(columns, f"{filename}.ndjson").response(queryset)
+    raise ValueError(f"Unsupported report format: {report_format}")
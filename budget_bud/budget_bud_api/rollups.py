@@ -0,0 +1,108 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Q, Sum, Count
+from .models import MonthlyRollup, Transaction
+
+ROLLUP_KEY_FIELDS = ['user_id', 'family_id', 'category_id', 'budget_id', 'account_id', 'transaction_type']
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def next_month(date):
+    return (date.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def rollup_key(transaction):
+    key = {field: getattr(transaction, field) for field in ROLLUP_KEY_FIELDS}
+    key['month'] = month_start(transaction.date)
+    return tuple(sorted(key.items()))
+
+
+def apply_rollup_deltas(deltas):
+    for key, (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+        key = dict(key)
+        rollups = MonthlyRollup.objects.filter(**key)
+        changes = {'total': F('total') + amount, 'count': F('count') + count}
+        if rollups.update(**changes) or count <= 0:
+            continue
+
+        # First write for this key. A concurrent writer may insert the same key first, in which case
+        # the unique index rejects this insert and the delta is added to that row instead.
+        try:
+            with db_transaction.atomic():
+                MonthlyRollup.objects.create(**key, total=amount, count=count)
+        except IntegrityError:
+            rollups.update(**changes)
+
+
+def record_rollups(added=(), removed=()):
+    deltas = defaultdict(lambda: (Decimal(0), 0))
+    for transactions, sign in ((added, 1), (removed, -1)):
+        for transaction in transactions:
+            key = rollup_key(transaction)
+            amount, count = deltas[key]
+            deltas[key] = (amount + sign * Decimal(transaction.amount), count + sign)
+    apply_rollup_deltas(deltas)
+
+
+def split_range(start_date, end_date):
+    # Whole calendar months inside the range are answered from MonthlyRollup; the partial months
+    # at either edge still have to be read from Transaction.
+    first_month = month_start(start_date)
+    if first_month != start_date:
+        first_month = next_month(first_month)
+
+    last_month = month_start(end_date)
+    if next_month(last_month) - timedelta(days=1) != end_date:
+        last_month = month_start(last_month - timedelta(days=1))
+
+    if first_month > last_month:
+        return None, [(start_date, end_date)]
+
+    edges = []
+    if start_date < first_month:
+        edges.append((start_date, first_month - timedelta(days=1)))
+    if next_month(last_month) <= end_date:
+        edges.append((next_month(last_month), end_date))
+    return (first_month, last_month), edges
+
+
+def rollup_totals(group_by, start_date=None, end_date=None, **filters):
+    rollups = MonthlyRollup.objects.filter(**filters)
+    edges = []
+
+    if start_date and end_date:
+        months, edges = split_range(start_date, end_date)
+        if months:
+            rollups = rollups.filter(month__gte=months[0], month__lte=months[1])
+        else:
+            rollups = rollups.none()
+
+    totals = defaultdict(lambda: {'total': Decimal(0), 'count': 0})
+
+    results = [rollups.values(*group_by).annotate(group_total=Sum('total'), group_count=Sum('count')).order_by()]
+    if edges:
+        edge_filter = Q()
+        for edge_start, edge_end in edges:
+            edge_filter |= Q(date__gte=edge_start, date__lte=edge_end)
+        results.append(
+            Transaction.objects.filter(edge_filter, **filters)
+            .values(*group_by)
+            .annotate(group_total=Sum('amount'), group_count=Count('id'))
+            .order_by()
+        )
+
+    for result in results:
+        for entry in result:
+            group = tuple(entry[field] for field in group_by)
+            totals[group]['total'] += entry['group_total'] or 0
+            totals[group]['count'] += entry['group_count'] or 0
+
+    return {group: values for group, values in totals.items() if values['count']}
+
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.db import transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from decimal import Decimal
 import uuid
 from .models import Family, Category, Budget, Transaction, Account, ReportDashboard, Report, SavingsGoal, BudgetGoal, \
     Invitation
@@ -170,6 +171,16 @@ class BudgetGoalSerializer(serializers.ModelSerializer):
         fields = ['budget', 'target_balance', 'start_date', 'end_date']
 
 
+class TransactionImportSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    transaction_type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPES)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    category = serializers.IntegerField()
+    budget = serializers.IntegerField()
+    account = serializers.IntegerField()
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
     budget = serializers.PrimaryKeyRelatedField(queryset=Budget.objects.all())
@@ -228,6 +239,33 @@ class TransactionSerializer(serializers.ModelSerializer):
         return instance
 
 
+TRANSACTION_VALUE_FIELDS = {
+    'id': 'id',
+    'date': 'date',
+    'amount': 'amount',
+    'transaction_type': 'transaction_type',
+    'description': 'description',
+    'category': 'category_id',
+    'budget': 'budget_id',
+    'account': 'account_id',
+    'is_recurring': 'is_recurring',
+    'recurring_type': 'recurring_type',
+    'next_occurrence': 'next_occurrence',
+    'family': 'family_id',
+}
+
+
+def transaction_values(queryset, fields=None):
+    fields = fields or TRANSACTION_VALUE_FIELDS
+    columns = {TRANSACTION_VALUE_FIELDS[field] for field in fields} | {'id', 'date'}
+    return queryset.values(*columns)
+
+
+def transaction_row(entry, fields=None):
+    fields = fields or TRANSACTION_VALUE_FIELDS
+    return {field: entry[TRANSACTION_VALUE_FIELDS[field]] for field in fields}
+
+
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
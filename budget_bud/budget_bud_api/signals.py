@@ -0,0 +1,98 @@
+import threading
+from django.db.models import QuerySet
+from django.db.models.signals import pre_delete, post_delete, post_save, m2m_changed
+from django.dispatch import receiver
+from .cache import bump_generations, bump_transaction_owners
+from .models import Transaction, Account, Budget, Category, Family, SavingsGoal
+from .ledger import record_balances, record_goal_progress
+from .rollups import record_rollups
+
+
+def deleted_directly(origin, model=Transaction):
+    # Deleting a user, family, category, budget or account cascades to its rollups as well,
+    # so only deletions that start from transactions themselves need reversing.
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+# A single delete can cascade to thousands of transactions. Django sends every pre_delete before
+# deleting anything, so the accounts and budgets going away and the number of transactions to expect
+# are known up front; the ledger is then reversed once, after the last transaction is gone.
+pending_deletes = threading.local()
+
+
+def pending_delete(origin):
+    state = getattr(pending_deletes, 'state', None)
+    # Any state left over from an earlier delete (another origin, or one already past its
+    # pre_delete phase) belongs to a delete that failed part way and is discarded.
+    if state is None or state['origin'] is not origin or state['removed']:
+        state = pending_deletes.state = {
+            'origin': origin, 'accounts': set(), 'budgets': set(), 'expected': 0, 'removed': [],
+        }
+    return state
+
+
+@receiver(pre_delete, sender=Account)
+def collect_deleted_account(sender, instance, origin=None, **kwargs):
+    pending_delete(origin)['accounts'].add(instance.pk)
+
+
+@receiver(pre_delete, sender=Budget)
+def collect_deleted_budget(sender, instance, origin=None, **kwargs):
+    pending_delete(origin)['budgets'].add(instance.pk)
+
+
+@receiver(pre_delete, sender=Transaction)
+def collect_deleted_transaction(sender, instance, origin=None, **kwargs):
+    pending_delete(origin)['expected'] += 1
+
+
+@receiver(post_delete, sender=Transaction)
+def reverse_deleted_transactions(sender, instance, origin=None, **kwargs):
+    state = pending_deletes.state
+    state['removed'].append(instance)
+    if len(state['removed']) < state['expected']:
+        return
+    pending_deletes.state = None
+    removed = state['removed']
+
+    if deleted_directly(origin):
+        record_rollups(removed=removed)
+    # Snapshots and balances go away with their account, and goals with their budget.
+    record_balances(removed=[row for row in removed if row.account_id not in state['accounts']])
+    record_goal_progress(removed=[row for row in removed if row.budget_id not in state['budgets']])
+    bump_transaction_owners(removed)
+
+
+def invalidate_owner_reports(sender, instance, **kwargs):
+    bump_generations(user_ids=[instance.user_id], family_ids=[getattr(instance, 'family_id', None)])
+
+
+def invalidate_owner_reports_on_delete(sender, instance, origin=None, **kwargs):
+    # Rows removed by a cascade are covered by the invalidation of the object that was deleted.
+    if deleted_directly(origin, sender):
+        invalidate_owner_reports(sender, instance)
+
+
+# Transactions invalidate their owners from Transaction.record_ledger_change and reverse_deleted_transactions.
+for model in (Account, Budget, Category):
+    post_save.connect(invalidate_owner_reports, sender=model)
+    post_delete.connect(invalidate_owner_reports_on_delete, sender=model)
+
+
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+def invalidate_savings_goal_reports(sender, instance, **kwargs):
+    user_id = Account.objects.filter(pk=instance.account_id).values_list('user_id', flat=True).first()
+    bump_generations(user_ids=[user_id])
+
+
+@receiver(m2m_changed, sender=Family.members.through)
+def invalidate_family_reports(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_generations(user_ids=[instance.pk], family_ids=pk_set or [])
+    else:
+        bump_generations(user_ids=pk_set or [], family_ids=[instance.pk])
@@ -1,22 +1,67 @@
 from django_apscheduler.jobstores import DjangoJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from django.db import transaction as db_transaction
 from datetime import date
 
 
 def check_budget_goals():
-    from .models import BudgetGoal
-    today = date.today()
-    budgets = BudgetGoal.objects.filter(end_date=today)
-    for budget in budgets:
-        budget.check_goal_met()
+    from .goals import sweep_budget_goals
+    sweep_budget_goals(date.today())
 
 def check_savings_goal():
-    from .models import SavingsGoal
-    today = date.today()
-    savings_goals = SavingsGoal.objects.filter(end_date=today)
-    for goals in savings_goals:
-        goals.check_goal_met()
+    from .goals import sweep_savings_goals
+    sweep_savings_goals(date.today())
+
+def materialize_recurring_transactions(today=None, batch_size=500):
+    from .models import Transaction, next_occurrence_after
+    from .ledger import create_transactions
+    today = today or date.today()
+    due = (
+        Transaction.objects.filter(is_recurring=True, next_occurrence__lte=today)
+        .exclude(recurring_type='one-time')
+        .order_by('id')
+    )
+
+    created = 0
+    last_id = 0
+    while True:
+        # Each batch claims its templates, writes their occurrences and advances next_occurrence
+        # in one transaction, so a rerun (or a second worker) never sees the same occurrence twice.
+        with db_transaction.atomic():
+            templates = list(due.filter(id__gt=last_id).select_for_update(skip_locked=True)[:batch_size])
+            if not templates:
+                break
+
+            occurrences = []
+            for template in templates:
+                occurrence = template.next_occurrence
+                while occurrence is not None and occurrence <= today:
+                    occurrences.append(Transaction(
+                        transaction_type=template.transaction_type,
+                        amount=template.amount,
+                        description=template.description,
+                        date=occurrence,
+                        category_id=template.category_id,
+                        budget_id=template.budget_id,
+                        account_id=template.account_id,
+                        user_id=template.user_id,
+                        family_id=template.family_id,
+                    ))
+                    occurrence = next_occurrence_after(occurrence, template.recurring_type, template.date.day)
+                template.next_occurrence = occurrence
+
+            create_transactions(occurrences, batch_size=batch_size)
+            Transaction.objects.bulk_update(templates, ['next_occurrence'], batch_size=batch_size)
+
+        created += len(occurrences)
+        last_id = templates[-1].id
+
+    return created
+
+def deliver_queued_emails():
+    from .outbox import deliver_outbox
+    deliver_outbox()
 
 def start_scheduler():
     scheduler = BackgroundScheduler()
@@ -36,4 +81,18 @@ def start_scheduler():
         replace_existing=True,
     )
 
+    scheduler.add_job(
+        materialize_recurring_transactions,
+        trigger=CronTrigger(hour=0, minute=15),
+        id="materialize_recurring_transactions",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        deliver_queued_emails,
+        trigger=CronTrigger(minute='*'),
+        id="deliver_queued_emails",
+        replace_existing=True,
+    )
+
     scheduler.start()
\ No newline at end of file
@@ -1,3 +1,842 @@
-from django.test import TestCase
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import F, QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .benchmarks import BENCHMARK_ROUTES, FAMILY_VIEW_ROUTES, QUERY_BUDGETS, benchmark_routes, find_regressions, \
+    seed_dataset
+from .cache import GENERATION_CACHE
+from .ledger import balances_at, create_transactions
+from .models import Account, BalanceHistory, Budget, BudgetGoal, Category, Family, MonthlyRollup, OutboundEmail, \
+    SavingsGoal, Transaction
+from .outbox import deliver_outbox
+from .renderers import CustomJSONRenderer
+from .rollups import record_rollups
+from .tasks import materialize_recurring_transactions
 
-# Create your tests here.
+HISTORY_START = date(2020, 1, 1)
+NO_CACHE = {alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+            for alias in ('default', GENERATION_CACHE)}
+
+
+Owner = namedtuple('Owner', 'user account category budget')
+
+
+def benchmark(test):
+    # Wall-clock and memory thresholds depend on the machine, so they only run when asked for:
+    # BENCHMARKS=1 python manage.py test budget_bud_api --tag benchmark
+    return tag('benchmark')(skipUnless(os.getenv('BENCHMARKS'), "set BENCHMARKS=1 to run benchmarks")(test))
+
+
+def create_owner(username, history_days=0):
+    user = User.objects.create_user(username, f'{username}@example.com')
+    owner = Owner(
+        user,
+        Account.objects.create(name=f'{username} account', balance=1000, user=user),
+        Category.objects.create(name=f'{username} category', user=user),
+        Budget.objects.create(name=f'{username} budget', total_amount=500, user=user),
+    )
+    if history_days:
+        daily_history(owner, history_days)
+    return owner
+
+
+def owner_transaction(owner, **fields):
+    return Transaction(**{
+        'date': HISTORY_START, 'amount': Decimal('10.00'), 'transaction_type': 'expense', 'user': owner.user,
+        'account': owner.account, 'category': owner.category, 'budget': owner.budget, **fields,
+    })
+
+
+def daily_history(owner, days, start=HISTORY_START):
+    return create_transactions([
+        owner_transaction(owner, date=start + timedelta(days=offset), transaction_type='income')
+        for offset in range(days)
+    ])
+
+
+class BalanceLedgerTests(TestCase):
+    def backdated_insert(self, history_days):
+        owner = create_owner(f'ledger-{history_days}', history_days)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            owner_transaction(owner, amount=Decimal('5.00')).save()
+            elapsed = time.perf_counter() - started
+            query_count = len(queries)
+
+        account = Account.objects.get(pk=owner.account.pk)
+        self.assertEqual(account.balance, 1000 + 10 * history_days - 5)
+        self.assertEqual(BalanceHistory.objects.filter(account=account).latest('date').balance, account.balance)
+        return query_count, elapsed
+
+    def test_backdated_insert_queries_stay_flat_as_history_grows(self):
+        # Every later snapshot moves in one UPDATE, so ten times the history adds no queries.
+        self.assertEqual(self.backdated_insert(300)[0], self.backdated_insert(30)[0])
+
+    @benchmark
+    def test_backdated_insert_time_stays_flat_as_history_grows(self):
+        short_time = self.backdated_insert(30)[1]
+        long_time = self.backdated_insert(3000)[1]
+
+        # A hundred times the history may cost little more than the short run; per-row work would.
+        self.assertLess(long_time, short_time * 10 + 0.05)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=NO_CACHE)
+class CategoryDataQueryCountTests(TestCase):
+    def setUp(self):
+        self.owner = create_owner('category-data')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner.user)
+
+    def add_categories(self, count):
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {Category.objects.count() + number}', user=self.owner.user)
+            for number in range(count)
+        ])
+        create_transactions([owner_transaction(self.owner, category=category) for category in categories])
+
+    def request_query_count(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+            query_count = len(queries)
+        self.assertEqual(response.status_code, 200)
+        return query_count
+
+    def test_query_count_does_not_grow_with_categories(self):
+        date_range = {'start_date': str(HISTORY_START), 'end_date': str(HISTORY_START + timedelta(days=30))}
+        requests = [
+            lambda: self.client.get('/api/category/data/'),
+            lambda: self.client.post('/api/category/data/', date_range, format='json'),
+        ]
+
+        self.add_categories(3)
+        baseline = [self.request_query_count(request) for request in requests]
+
+        self.add_categories(30)
+        for request, query_count in zip(requests, baseline):
+            with self.assertNumQueries(query_count):
+                response = request()
+            self.assertEqual(response.status_code, 200)
+            balances = {row['name']: row['balance'] for row in response.data}
+            self.assertEqual(len(balances), 34)
+            self.assertEqual(balances['Category 33'], -10)
+            self.assertEqual(balances[self.owner.category.name], 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PDFReportStreamingTests(TestCase):
+    def stream_peak(self, rows):
+        owner = create_owner(f'pdf-{rows}', rows)
+        client = APIClient()
+        client.force_authenticate(owner.user)
+
+        response = client.post('/api/account/history/', {
+            'account_id': owner.account.id, 'format': 'pdf', 'start_date': str(HISTORY_START),
+            'end_date': str(HISTORY_START + timedelta(days=rows)),
+        }, format='json')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        size = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                size += len(chunk)
+                if size == len(chunk):
+                    self.assertTrue(chunk.startswith(b'%PDF-1.4'))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertTrue(chunk.endswith(b'%%EOF\n'))
+        return peak, size
+
+    def test_report_streams_a_complete_pdf_for_every_row(self):
+        small_size = self.stream_peak(100)[1]
+        large_size = self.stream_peak(500)[1]
+
+        self.assertGreater(large_size, small_size * 4)
+
+    @benchmark
+    def test_peak_memory_stays_flat_as_rows_grow(self):
+        small_peak = self.stream_peak(2000)[0]
+        large_peak = self.stream_peak(10000)[0]
+
+        # Both runs fill a whole database fetch, so what remains is one page plus the object offsets:
+        # five times the rows may not come close to doubling the peak.
+        self.assertLess(large_peak, small_peak * 2)
+
+
+def formatted_copy(data):
+    # The pre-pass the renderer used to run: a full copy of the payload with every Decimal as a string.
+    if isinstance(data, dict):
+        return {key: formatted_copy(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [formatted_copy(item) for item in data]
+    elif isinstance(data, Decimal):
+        return f"{data:.2f}"
+    return data
+
+
+class DecimalRendererTests(TestCase):
+    def payload(self, count):
+        return [
+            {'id': number, 'amount': Decimal(number % 50000) / 100, 'description': f'Transaction {number}',
+             'budget': 'Groceries', 'category': 'Food', 'account': 'Checking',
+             'date': HISTORY_START + timedelta(days=number % 3650), 'transaction_type': 'expense'}
+            for number in range(count)
+        ]
+
+    def render(self, render, data):
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            content = render(data)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return content, elapsed, peak
+
+    def render_both(self, count):
+        data = self.payload(count)
+        rendered = self.render(CustomJSONRenderer().render, data)
+        reference = self.render(lambda data: JSONRenderer().render(formatted_copy(data)), data)
+        self.assertEqual(rendered[0], reference[0])
+        return rendered, reference
+
+    def test_encoder_output_matches_the_pre_pass(self):
+        (content, _, _), _ = self.render_both(2000)
+
+        self.assertEqual(json.loads(content)[1234]['amount'], '12.34')
+
+    @benchmark
+    def test_encoder_formats_50k_transactions_without_copying_the_payload(self):
+        (content, elapsed, peak), (_, reference_elapsed, reference_peak) = self.render_both(50000)
+
+        # Formatting from default() leaves only the encoder's own buffers: no second copy of the payload,
+        # and no slower than encoding the pre-formatted copy.
+        self.assertLess(peak, reference_peak * 0.75)
+        self.assertLess(peak, len(content) * 3)
+        self.assertLess(elapsed, reference_elapsed * 1.5)
+
+
+class MonthlyRollupTests(TestCase):
+    def test_first_and_later_writes_for_a_key_share_one_row(self):
+        owner = create_owner('rollups', 3)
+        owner_transaction(owner, amount=Decimal('5.00'), transaction_type='income').save()
+
+        rollup = MonthlyRollup.objects.get(user=owner.user)
+        self.assertEqual((rollup.month, rollup.total, rollup.count), (HISTORY_START, Decimal('35.00'), 4))
+
+    def test_unique_index_covers_rollups_without_a_family(self):
+        owner = create_owner('rollup-index')
+        key = {'user': owner.user, 'family': None, 'month': HISTORY_START, 'category': owner.category,
+               'budget': owner.budget, 'account': owner.account, 'transaction_type': 'expense'}
+        MonthlyRollup.objects.create(**key)
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            MonthlyRollup.objects.create(**key)
+
+    def test_insert_that_loses_a_race_adds_to_the_winning_row(self):
+        owner = create_owner('rollup-race')
+        transaction = owner_transaction(owner, amount=Decimal('5.00'))
+        record_rollups(added=[transaction])
+
+        # The first UPDATE misses, as it would if the winning row were committed just after it ran.
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            record_rollups(added=[transaction])
+
+        rollup = MonthlyRollup.objects.get(user=owner.user)
+        self.assertEqual((rollup.total, rollup.count), (Decimal('10.00'), 2))
+
+
+class RecurringMaterializationTests(TestCase):
+    def materialize(self, templates, batch_size):
+        owner = create_owner(f'recurring-{templates}')
+        today = HISTORY_START + timedelta(days=1)
+        Transaction.objects.bulk_create([
+            owner_transaction(owner, description=f'Template {number}', is_recurring=True, recurring_type='daily',
+                              next_occurrence=today)
+            for number in range(templates)
+        ], batch_size=batch_size)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            created = materialize_recurring_transactions(today=today, batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+            query_count = len(queries)
+
+        self.assertEqual(created, templates)
+        self.assertEqual(materialize_recurring_transactions(today=today, batch_size=batch_size), 0)
+        self.assertEqual(Account.objects.get(pk=owner.account.pk).balance, 1000 - 10 * templates)
+        return query_count, elapsed
+
+    def test_queries_grow_per_batch_not_per_template(self):
+        # Each batch is a fixed set of bulk statements.
+        batch_queries = self.materialize(100, batch_size=100)[0]
+        self.assertLessEqual(self.materialize(400, batch_size=100)[0], batch_queries * 4)
+
+    @benchmark
+    def test_time_per_template_stays_near_a_single_batch(self):
+        # Set BENCHMARK_RECURRING_TEMPLATES=100000 for the full-size run.
+        batch_size = 500
+        templates = int(os.getenv('BENCHMARK_RECURRING_TEMPLATES', batch_size * 4))
+
+        batch_time = self.materialize(batch_size, batch_size)[1]
+        elapsed = self.materialize(templates, batch_size)[1]
+
+        self.assertLess(elapsed / templates, batch_time / batch_size * 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=NO_CACHE)
+class ProfileStatsTests(TestCase):
+    def profile_stats(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            return client.get('/api/profile/stats/').data
+
+    def test_stats_are_read_in_one_query(self):
+        owner = create_owner('profile', 3)
+        owner_transaction(owner, amount=Decimal('5.00')).save()
+        for goal_met in (True, True, False):
+            SavingsGoal.objects.create(account=owner.account, target_balance=100, start_date=HISTORY_START,
+                                       end_date=HISTORY_START, goal_met=goal_met)
+
+        stats = self.profile_stats(owner.user)
+
+        self.assertEqual(
+            {key: stats[key] for key in ('total_transactions', 'savings_goals_met', 'net_income', 'net_expense')},
+            {'total_transactions': 4, 'savings_goals_met': 2, 'net_income': 30, 'net_expense': 5},
+        )
+        self.assertEqual(stats['net_balance'], 25)
+
+    def test_goals_are_counted_for_a_user_without_transactions(self):
+        owner = create_owner('profile-empty')
+        SavingsGoal.objects.create(account=owner.account, target_balance=100, start_date=HISTORY_START,
+                                   end_date=HISTORY_START, goal_met=True)
+
+        stats = self.profile_stats(owner.user)
+
+        self.assertEqual((stats['total_transactions'], stats['savings_goals_met'], stats['net_balance']), (0, 1, None))
+
+
+REPORT_TABLES = ('budget_bud_api_transaction', 'budget_bud_api_balancehistory', 'budget_bud_api_monthlyrollup')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=NO_CACHE)
+class ReportQueryPlanTests(TestCase):
+    read_only_routes = [route for route in BENCHMARK_ROUTES
+                        if route[0] not in ('transaction_create', 'transaction_import')]
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0].strip() for row in cursor.fetchall()
+                        if 'Seq Scan' in row[0] and any(table in row[0] for table in REPORT_TABLES)]
+
+            # SQLite names subquery tables by their alias (U0, T4), so aliases are mapped back first.
+            tables = {alias: table for table, alias in re.findall(r'"(\w+)" ([A-Z]\d+)\b', sql)}
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            scans = []
+            for row in cursor.fetchall():
+                step = row[-1].split()
+                if step[0] == 'SCAN' and tables.get(step[1], step[1]) in REPORT_TABLES and 'USING' not in step:
+                    scans.append(row[-1])
+            return scans
+
+    def test_report_queries_use_an_index(self):
+        user, context = seed_dataset(200)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        if connection.vendor == 'postgresql':
+            # The seeded tables are small enough that scanning beats probing, so the planner is told to avoid
+            # sequential scans; one still showing up means no usable index exists.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        failures = []
+        for name, method, path, data in self.read_only_routes:
+            paths = [path]
+            if name in FAMILY_VIEW_ROUTES:
+                paths.append(f"{path}{'&' if '?' in path else '?'}familyView=true")
+            for route_path in paths:
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, method)(route_path, data(context) if data else None, format='json')
+                    statements = [query['sql'] for query in queries.captured_queries]
+                self.assertLess(response.status_code, 300, route_path)
+                for sql in statements:
+                    if sql.startswith('SELECT') and any(table in sql for table in REPORT_TABLES):
+                        failures.extend(f'{method.upper()} {route_path}: {scan}' for scan in self.full_scans(sql))
+
+        self.assertEqual(failures, [])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReportCacheInvalidationTests(TestCase):
+    def test_member_posting_onto_another_members_account_refreshes_the_owners_reports(self):
+        owner = create_owner('cache-owner')
+        member = create_owner('cache-member').user
+        family = Family.objects.create(name='Cache family')
+        family.members.add(owner.user, member)
+        client = APIClient()
+        client.force_authenticate(owner.user)
+
+        routes = ['/api/accounts/overview-report/', '/api/accounts/net-worth/']
+        before = [client.get(route).data for route in routes]
+        self.assertEqual(before, [client.get(route).data for route in routes])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            owner_transaction(owner, date=date.today(), amount=Decimal('40.00'), user=member, family=family).save()
+
+        for route, cached in zip(routes, before):
+            self.assertNotEqual(client.get(route).data, cached, route)
+
+    def test_family_reports_are_keyed_by_the_requesters_families(self):
+        # shared belongs to both families, other_a only to the first, other_b only to the second.
+        shared, other_a, other_b = (create_owner(f'families-{name}', 1) for name in ('shared', 'a', 'b'))
+        first, second = Family.objects.create(name='First'), Family.objects.create(name='Second')
+        first.members.add(shared.user, other_a.user)
+        second.members.add(shared.user, other_b.user)
+
+        def family_categories(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            return {row['name'] for row in client.get('/api/category/data/?familyView=true').data}
+
+        self.assertIn('families-b category', family_categories(shared.user))
+        self.assertNotIn('families-b category', family_categories(other_a.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='families-b new category', user=other_b.user)
+        self.assertIn('families-b new category', family_categories(shared.user))
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stand-in')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            elif command == 'RCPT' and 'reject' in line:
+                self.reply('550 recipient rejected')
+            elif command == 'RCPT':
+                recipients.append(line)
+                self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages.append(recipients)
+                recipients = []
+                self.reply('250 queued')
+            else:
+                recipients = [] if command == 'RSET' else recipients
+                self.reply('250 ok')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPStandInHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        mail_settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.server_address[1], EMAIL_USE_TLS=False, EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='', EMAIL_TIMEOUT=5,
+        )
+        mail_settings.enable()
+        self.addCleanup(mail_settings.disable)
+
+    def queue(self, recipients):
+        OutboundEmail.objects.bulk_create([
+            OutboundEmail(recipient=recipient, subject='Budget alert', text_body='Over budget')
+            for recipient in recipients
+        ])
+
+    def deliver(self, count):
+        self.queue(f'user{number}@example.com' for number in range(count))
+
+        started = time.perf_counter()
+        sent, failed = deliver_outbox(batch_size=100)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual((sent, failed), (count, 0))
+        self.assertEqual(len(self.server.messages), count)
+        self.assertEqual(self.server.connections, 1)
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        return elapsed
+
+    def test_batches_share_one_smtp_session(self):
+        self.deliver(300)
+
+    @benchmark
+    def test_delivery_rate(self):
+        # Locally this runs at several hundred messages a second; reconnecting or committing per message
+        # would show up here first.
+        self.assertGreater(1000 / self.deliver(1000), 50)
+
+    def test_failed_send_is_rescheduled_and_the_rest_still_go_out(self):
+        self.queue(['first@example.com', 'reject@example.com', 'last@example.com'])
+
+        self.assertEqual(deliver_outbox(batch_size=2), (2, 0))
+
+        rejected = OutboundEmail.objects.get(recipient='reject@example.com')
+        self.assertEqual((rejected.status, rejected.attempts), ('pending', 1))
+        self.assertGreater(rejected.next_attempt_at, timezone.now())
+        self.assertIn('reject@example.com', rejected.last_error)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+
+class CascadeDeleteTests(TestCase):
+    def test_deleting_a_family_reverses_only_the_accounts_that_survive(self):
+        owner = create_owner('family-delete')
+        family = Family.objects.create(name='Deleted family')
+        family.members.add(owner.user)
+        shared = Account.objects.create(name='Shared', balance=200, user=owner.user, family=family)
+        for target in (owner.account, shared):
+            create_transactions([
+                owner_transaction(owner, date=HISTORY_START + timedelta(days=offset), account=target, family=family)
+                for offset in range(3)
+            ])
+
+        family.delete()
+
+        self.assertEqual(Account.objects.get(pk=owner.account.pk).balance, 1000)
+        self.assertFalse(Account.objects.filter(pk=shared.pk).exists())
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(BalanceHistory.objects.filter(account_id=shared.pk).exists())
+
+    def category_delete_queries(self, rows):
+        owner = create_owner(f'category-delete-{rows}')
+        goal = BudgetGoal.objects.create(budget=owner.budget, target_balance=100, start_date=HISTORY_START,
+                                         end_date=HISTORY_START + timedelta(days=rows))
+        daily_history(owner, rows)
+
+        with CaptureQueriesContext(connection) as queries:
+            owner.category.delete()
+            query_count = len(queries)
+
+        goal.refresh_from_db()
+        self.assertEqual(Account.objects.get(pk=owner.account.pk).balance, 1000)
+        self.assertEqual(goal.current_balance, 0)
+        self.assertEqual(BalanceHistory.objects.filter(account=owner.account).latest('date').balance, 1000)
+        return query_count
+
+    def test_cascade_reverses_the_ledger_in_one_pass(self):
+        # Django itself issues one DELETE per hundred rows; everything else stays the same.
+        self.assertEqual(self.category_delete_queries(200), self.category_delete_queries(20) + 1)
+
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240105120000<TRNAMT>250.00<NAME>Salary
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240106<TRNAMT>-40.50<NAME>Shop<MEMO>Groceries
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        self.user, self.account, self.category, self.budget = create_owner('importer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.defaults = {'account': self.account.id, 'category': self.category.id, 'budget': self.budget.id}
+
+    def upload(self, name, content, **data):
+        return self.client.post('/api/transaction-import/', {'file': SimpleUploadedFile(name, content.encode()),
+                                                             **self.defaults, **data}, format='multipart')
+
+    def imported(self):
+        return list(Transaction.objects.filter(user=self.user).order_by('date').values_list(
+            'date', 'amount', 'transaction_type', 'description', 'account_id'
+        ))
+
+    def test_json_rows(self):
+        rows = [{'date': '2024-01-05', 'amount': '12.50', 'transaction_type': 'expense', 'description': 'Lunch',
+                 **self.defaults}]
+
+        response = self.client.post('/api/transaction-import/', rows, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.imported(), [(date(2024, 1, 5), Decimal('12.50'), 'expense', 'Lunch', self.account.id)])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('987.50'))
+
+    def test_csv_upload_takes_the_request_defaults(self):
+        response = self.upload('statement.csv', 'Date,Amount,Transaction_Type,Description\n'
+                                                '2024-01-05,30.00,income,Refund\n')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.imported(), [(date(2024, 1, 5), Decimal('30.00'), 'income', 'Refund', self.account.id)])
+
+    def test_ofx_upload(self):
+        response = self.upload('statement.ofx', OFX_STATEMENT)
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.imported(), [
+            (date(2024, 1, 5), Decimal('250.00'), 'income', 'Salary', self.account.id),
+            (date(2024, 1, 6), Decimal('40.50'), 'expense', 'Groceries', self.account.id),
+        ])
+
+    def test_blank_csv_cells_fall_back_to_the_request_defaults(self):
+        savings = Account.objects.create(name='Savings', balance=0, user=self.user)
+
+        response = self.upload('statement.csv', 'date,amount,transaction_type,description,account\n'
+                                                '2024-01-05,10.00,expense,Default,\n'
+                                                f'2024-01-06,20.00,expense,Savings,{savings.id}\n')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([row[4] for row in self.imported()], [self.account.id, savings.id])
+
+    def test_rows_for_another_users_account_are_rejected(self):
+        other_account = create_owner('not-the-importer').account
+
+        response = self.upload('statement.csv', 'date,amount,transaction_type,account\n'
+                                                f'2024-01-05,10.00,expense,{other_account.id}\n')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'Account {other_account.id} does not exist', response.data['error'])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class BalancesAtTests(TestCase):
+    def test_matches_get_balance_at_date_across_gaps_and_before_the_first_snapshot(self):
+        user, account = create_owner('balances-at')[:2]
+        for day, balance in ((3, 1010), (4, 990), (10, 1200)):
+            BalanceHistory.objects.create(account=account, date=HISTORY_START + timedelta(days=day), balance=balance)
+        untouched = Account.objects.create(name='Untouched', balance=300, user=user)
+        dates = [HISTORY_START + timedelta(days=day) for day in (0, 3, 5, 6, 9, 10, 11, 30)]
+
+        with self.assertNumQueries(2):
+            balances = balances_at([account.id, untouched.id], dates)
+
+        for single_date in dates:
+            self.assertEqual(balances[single_date], {
+                account.id: account.get_balance_at_date(single_date),
+                untouched.id: untouched.get_balance_at_date(single_date),
+            }, single_date)
+        self.assertEqual([balances[single_date][account.id] for single_date in dates],
+                         [1000, 1010, 990, 990, 990, 1200, 1200, 1200])
+
+    def test_query_count_does_not_grow_with_dates(self):
+        account = create_owner('balances-at-many').account
+        dates = [HISTORY_START + timedelta(days=day) for day in range(365)]
+
+        with self.assertNumQueries(2):
+            balances = balances_at([account.id], dates)
+
+        self.assertEqual(len(balances), 365)
+
+
+class RebuildLedgersTests(TransactionTestCase):
+    def drifted_account(self, username):
+        account = create_owner(username, 10).account
+        # A lost update left the balance, and every snapshot from the fifth day on, 25 too high, on an
+        # account old enough to have no recorded opening balance.
+        BalanceHistory.objects.filter(account=account, date__gte=HISTORY_START + timedelta(days=4)).update(
+            balance=F('balance') + 25
+        )
+        Account.objects.filter(pk=account.pk).update(balance=F('balance') + 25, opening_balance=None)
+        return account
+
+    def rebuild(self, *args):
+        output = StringIO()
+        call_command('rebuild_ledgers', *args, stdout=output)
+        return output.getvalue()
+
+    def snapshots(self, account):
+        return list(BalanceHistory.objects.filter(account=account).order_by('date').values_list('balance', flat=True))
+
+    def test_drift_is_corrected_from_the_earliest_snapshot(self):
+        account = self.drifted_account('rebuild-drift')
+
+        self.rebuild('--workers', '1')
+
+        account.refresh_from_db()
+        self.assertEqual((account.opening_balance, account.balance), (1000, 1100))
+        self.assertEqual(self.snapshots(account), [1010 + 10 * day for day in range(10)])
+
+    def test_dry_run_reports_drift_without_writing(self):
+        account = self.drifted_account('rebuild-dry-run')
+        snapshots = self.snapshots(account)
+
+        output = self.rebuild('--workers', '1', '--dry-run')
+
+        self.assertIn(f'Account {account.pk}: balance 1125.00 -> 1100.00', output)
+        self.assertIn('Would write 0 new and 6 corrected snapshots; 1 account balances changed.', output)
+        account.refresh_from_db()
+        self.assertEqual((account.opening_balance, account.balance), (None, 1125))
+        self.assertEqual(self.snapshots(account), snapshots)
+
+    def test_since_only_rewrites_later_snapshots(self):
+        account = self.drifted_account('rebuild-since')
+
+        self.rebuild('--workers', '1', '--since', str(HISTORY_START + timedelta(days=6)))
+
+        account.refresh_from_db()
+        self.assertEqual(account.balance, 1100)
+        self.assertEqual(self.snapshots(account), [1010 + 10 * day + (25 if day in (4, 5) else 0) for day in range(10)])
+
+    def test_workers_rebuild_every_account(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("worker processes cannot open an in-memory test database")
+        accounts = [self.drifted_account(f'rebuild-worker-{index}') for index in range(3)]
+
+        output = self.rebuild('--workers', '2')
+
+        self.assertIn('Wrote 0 new and 18 corrected snapshots; 3 account balances changed.', output)
+        for account in accounts:
+            account.refresh_from_db()
+            self.assertEqual(account.balance, 1100)
+            self.assertEqual(self.snapshots(account), [1010 + 10 * day for day in range(10)])
+
+
+@tag('benchmark')
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=NO_CACHE)
+class APIBenchmarkTests(TestCase):
+    def test_routes_stay_within_their_query_budgets(self):
+        results = {}
+        for size in (50, 500):
+            user, context = seed_dataset(size, seed=size)
+            for route, measurement in benchmark_routes(user, context, repeat=1).items():
+                results[f'{size}:{route}'] = measurement
+
+        self.assertEqual(set(QUERY_BUDGETS), {key.split(':', 1)[1] for key in results})
+        self.assertEqual(find_regressions(results, baseline={}), [])
+
+
+class MigrationBackfillTests(TransactionTestCase):
+    def migrate(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('budget_bud_api', name)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([('budget_bud_api', name)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_owner(self, apps):
+        user = apps.get_model('auth', 'User').objects.create(username='migrated', last_login=None)
+        account = apps.get_model('budget_bud_api', 'Account').objects.create(name='Checking', balance=1000, user=user)
+        category = apps.get_model('budget_bud_api', 'Category').objects.create(name='Food', user=user)
+        budget = apps.get_model('budget_bud_api', 'Budget').objects.create(name='Monthly', total_amount=500, user=user)
+        return user, account, category, budget
+
+    def test_0002_keeps_the_latest_snapshot_per_account_and_day(self):
+        apps = self.migrate('0001_initial')
+        account = self.create_owner(apps)[1]
+        BalanceHistory = apps.get_model('budget_bud_api', 'BalanceHistory')
+        for day, balance in ((1, 900), (1, 950), (2, 800), (1, 975), (2, 850)):
+            BalanceHistory.objects.create(account=account, date=date(2024, 1, day), balance=balance)
+
+        apps = self.migrate('0002_balancehistory_unique_account_date')
+
+        snapshots = apps.get_model('budget_bud_api', 'BalanceHistory').objects.order_by('date')
+        self.assertEqual([(row.date.day, row.balance) for row in snapshots], [(1, 975), (2, 850)])
+
+    def test_0003_rolls_existing_transactions_up_by_month(self):
+        apps = self.migrate('0002_balancehistory_unique_account_date')
+        user, account, category, budget = self.create_owner(apps)
+        Transaction = apps.get_model('budget_bud_api', 'Transaction')
+        for day in (date(2024, 1, 5), date(2024, 1, 20), date(2024, 2, 3)):
+            Transaction.objects.create(date=day, amount=Decimal('12.50'), transaction_type='expense', description='',
+                                       account=account, category=category, budget=budget, user=user)
+
+        apps = self.migrate('0003_monthlyrollup')
+
+        rollups = apps.get_model('budget_bud_api', 'MonthlyRollup').objects.order_by('month')
+        self.assertEqual([(row.month, row.total, row.count) for row in rollups],
+                         [(date(2024, 1, 1), Decimal('25.00'), 2), (date(2024, 2, 1), Decimal('12.50'), 1)])
+
+    def test_0007_backfills_opening_balances(self):
+        apps = self.migrate('0006_outboundemail')
+        user, account, category, budget = self.create_owner(apps)
+        Transaction = apps.get_model('budget_bud_api', 'Transaction')
+        Account = apps.get_model('budget_bud_api', 'Account')
+        drifted = Account.objects.create(name='Savings', balance=1000, user=user)
+        for target in (account, drifted):
+            for day, transaction_type, amount in ((5, 'income', 300), (10, 'expense', 50)):
+                Transaction.objects.create(date=date(2024, 1, day), amount=amount, transaction_type=transaction_type,
+                                           description='', account=target, category=category, budget=budget,
+                                           user=user)
+        # The drifted account's history says it opened at 800, whatever its balance now claims.
+        BalanceHistory = apps.get_model('budget_bud_api', 'BalanceHistory')
+        BalanceHistory.objects.create(account=drifted, date=date(2024, 1, 5), balance=1100)
+        BalanceHistory.objects.create(account=drifted, date=date(2024, 1, 10), balance=1050)
+
+        apps = self.migrate('0007_account_opening_balance')
+
+        opening_balances = apps.get_model('budget_bud_api', 'Account').objects.values_list('name', 'opening_balance')
+        self.assertEqual(dict(opening_balances), {'Checking': 750, 'Savings': 800})
+
+    def test_0008_creates_the_report_cache_table(self):
+        self.migrate('0007_account_opening_balance')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS report_cache')
+            cursor.execute('DROP TABLE IF EXISTS report_generation_cache')
+
+        self.migrate('0008_report_cache_table')
+
+        tables = connection.introspection.table_names()
+        self.assertIn('report_cache', tables)
+        self.assertIn('report_generation_cache', tables)
+
+    def test_0009_gives_existing_savings_goals_their_set_date(self):
+        apps = self.migrate('0008_report_cache_table')
+        account = self.create_owner(apps)[1]
+        apps.get_model('budget_bud_api', 'SavingsGoal').objects.create(account=account, target_balance=500,
+                                                                       date_set=date(2024, 3, 1))
+
+        apps = self.migrate('0009_budgetgoal_invitation_savingsgoal_dates')
+
+        goal = apps.get_model('budget_bud_api', 'SavingsGoal').objects.get()
+        self.assertEqual((goal.start_date, goal.end_date), (date(2024, 3, 1), date(2024, 3, 1)))
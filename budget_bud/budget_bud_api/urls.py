@@ -7,7 +7,7 @@ from .views import UserListCreateView, UserCreateView, UserRetrieveUpdateDestroy
     TransactionPieChartViewSet, BudgetTransactionView, FamilyCreateViewSet, AccountsOverviewReportView, UserReportsView, \
     ReportChoices, AccountHistory, SavingsGoalView, ProfileView, BudgetGoalView, BudgetHistoryView, \
     FamilyAddMemberViewSet, LoginView, FamilyOverviewView, FamilyHistoryView, CategoryDataView, CategoryHistoryView, \
-    CategoryHistoryLineChartView, ContactView
+    CategoryHistoryLineChartView, ContactView, TransactionImportView, NetWorthView
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename="category")
@@ -23,6 +23,7 @@ urlpatterns = [
     path('api/user/dashboard-report-options/', ReportChoices.as_view(), name='dashboard-report-options'),
     path('api/accounts/', AccountViewSet.as_view(), name='accounts'),
     path('api/accounts/overview-report/', AccountsOverviewReportView.as_view(), name='accounts-overview-report'),
+    path('api/accounts/net-worth/', NetWorthView.as_view(), name='accounts-net-worth'),
     path('api/profile/stats/', ProfileView.as_view(), name='profile-stats'),
     path('api/account/history/', AccountHistory.as_view(), name='account-history'),
     path('api/account/savings-goal/', SavingsGoalView.as_view(), name='savings-goal'),
@@ -40,6 +41,7 @@ urlpatterns = [
     path('api/category/history/line-chart/', CategoryHistoryLineChartView.as_view(), name='category-history-line-chart'),
     path('api/transaction-bar-chart/', TransactionBarChartViewSet.as_view(), name='transaction-bar-chart'),
     path('api/transaction-table-view/', TransactionTableViewSet.as_view(), name='transaction-table-view'),
+    path('api/transaction-import/', TransactionImportView.as_view(), name='transaction-import'),
     path('api/transaction-pie-chart/', TransactionPieChartViewSet.as_view(), name='transaction-pie-chart'),
     path('api/user/create/', UserCreateView.as_view(), name='user-create'),
     path('api/token/', LoginView.as_view(), name='token_obtain_pair'),
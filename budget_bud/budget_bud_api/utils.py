@@ -1,13 +1,14 @@
 from rest_framework.response import Response
-from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.template.loader import render_to_string
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 class SendEmail:
-    def send_mail(self, recipient, message_type, data):
+    def render(self, message_type, data):
         if message_type == 'Invitation':
             subject = 'Family Invitation'
             html_message = render_to_string('invitation.html', data)
@@ -19,11 +20,11 @@ class SendEmail:
         elif message_type == 'SavingsGoal':
             subject = 'Savings Goal Met!'
             html_message = render_to_string('savings_goal.html', data)
-            text_message = render_to_string('savings_goals.txt', data)
+            text_message = render_to_string('savings_goal.txt', data)
         elif message_type == 'SavingsGoalFailed':
             subject = 'Savings Goal'
             html_message = render_to_string('savings_goal_failed.html', data)
-            text_message = render_to_string('savings_goals_failed.txt', data)
+            text_message = render_to_string('savings_goal_failed.txt', data)
         elif message_type == 'BudgetGoal':
             subject = 'Budget Goal Met!'
             html_message = render_to_string('budget_goal.html', data)
@@ -44,12 +45,24 @@ class SendEmail:
                     <p>{html_user_message}</p>
                 """
 
-        from_email = settings.EMAIL_HOST_USER
-        recipient_list = [recipient]
+        return subject, text_message, html_message
+
+    def build_mail(self, recipient, message_type, data):
+        from .models import OutboundEmail
 
+        # Only the template name and its context are stored; the outbox worker renders the
+        # message when it is sent, which keeps bulk enqueueing (goal sweeps) cheap.
+        return OutboundEmail(
+            recipient=recipient,
+            from_email=settings.EMAIL_HOST_USER or '',
+            message_type=message_type,
+            context=json.loads(json.dumps(data, cls=DjangoJSONEncoder)),
+        )
+
+    def send_mail(self, recipient, message_type, data):
         try:
-            message = EmailMultiAlternatives(subject, text_message, from_email, recipient_list)
-            message.attach_alternative(html_message, "text/html")
-            message.send()
+            email = self.build_mail(recipient, message_type, data)
+            email.save()
+            return email
         except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
\ No newline at end of file
+            logger.error(f"Failed to queue email: {str(e)}")
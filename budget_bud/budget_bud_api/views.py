@@ -8,22 +8,27 @@ from datetime import datetime, timedelta
 import calendar
 from collections import defaultdict
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Sum
+from django.db.models import Sum, Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.core.validators import EmailValidator
 from django.core.exceptions import ValidationError
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.pdfgen import canvas
-from django.http import HttpResponse
-from io import BytesIO
 import uuid
 from .utils import SendEmail
 from .models import User, Family, Category, Budget, Transaction, Account, BalanceHistory, ReportDashboard, Report, \
-    SavingsGoal, Invitation
+    SavingsGoal, Invitation, add_months
 from .serializers import UserSerializer, UserCreateSerializer, FamilySerializer, CategorySerializer, BudgetSerializer, \
     TransactionSerializer, \
     AccountSerializer, ReportDashboardSerializer, SavingsGoalSerializer, BudgetGoalSerializer, \
-    InvitedUserCreateSerializer, InvitedUserSignInSerializer, ContactSerializer
+    InvitedUserCreateSerializer, InvitedUserSignInSerializer, ContactSerializer, TransactionImportSerializer, \
+    TRANSACTION_VALUE_FIELDS, transaction_values, transaction_row
+from .pagination import TransactionCursorPagination
+from .reports import PDFReport, ReportColumn, REPORT_FORMATS, report_response
+from .rollups import rollup_totals
+from .cache import cached_report, report_owner
+from .imports import TransactionImportError, import_format, decode_upload, parse_rows
+from .ledger import create_transactions, balances_at
+from .members import family_member_ids
 
 
 class LoginView(TokenObtainPairView):
@@ -202,39 +207,58 @@ class FamilyOverviewView(APIView):
             next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
             end_date = (next_month - timedelta(days=1)).date()
 
+        if category:
+            return self.cached_overview(family, 'category', start_date, end_date)
+        elif transaction:
+            return self.cached_overview(family, 'transaction', start_date, end_date)
+        return []
+
+    def cached_overview(self, family, mode, start_date=None, end_date=None):
+        counts = self.category_counts if mode == 'category' else self.transaction_counts
+        return cached_report('family', family.id, f'family_overview_{mode}', (start_date, end_date),
+                             lambda: counts(family, start_date, end_date))
+
+    def category_counts(self, family, start_date=None, end_date=None):
         members = family.members.all()
-        members_data = []
+        queryset = Transaction.objects.filter(user__in=members, category__user__in=members)
+        if start_date and end_date:
+            queryset = queryset.filter(date__gte=start_date, date__lte=end_date)
 
-        if category:
-            for member in members:
-                member_name = member.username
-                for category in Category.objects.filter(user__in=members):
-                    category_count = Transaction.objects.filter(
-                        category=category,
-                        user=member,
-                        date__gte=start_date,
-                        date__lte=end_date
-                    ).count()
-                    if category_count > 0:
-                        members_data.append({
-                            "name": member_name,
-                            "category": category.name,
-                            "category_count": category_count
-                        })
+        counts = (
+            queryset
+            .values('user_id', 'category_id', 'user__username', 'category__name')
+            .annotate(category_count=Count('id'))
+            .order_by('user_id', 'category_id')
+        )
 
-        elif transaction:
-            for member in members:
-                member_name = member.username
-                transaction_count = Transaction.objects.filter(
-                    user=member,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).count()
-                members_data.append({
-                    "name": member_name,
-                    "transaction_count": transaction_count
-                })
-        return members_data
+        return [
+            {
+                "name": entry['user__username'],
+                "category": entry['category__name'],
+                "category_count": entry['category_count']
+            }
+            for entry in counts
+        ]
+
+    def transaction_counts(self, family, start_date=None, end_date=None):
+        transaction_filter = Q()
+        if start_date and end_date:
+            transaction_filter = Q(transactions__date__gte=start_date, transactions__date__lte=end_date)
+
+        counts = (
+            family.members
+            .annotate(transaction_count=Count('transactions', filter=transaction_filter))
+            .values('username', 'transaction_count')
+            .order_by('id')
+        )
+
+        return [
+            {
+                "name": entry['username'],
+                "transaction_count": entry['transaction_count']
+            }
+            for entry in counts
+        ]
 
     def post(self, request, *args, **kwargs):
         print(f"Request = {request.data}")
@@ -274,31 +298,13 @@ class FamilyOverviewView(APIView):
         family = Family.objects.filter(members=user).first()
 
         if family:
-            members = family.members.all()
             members_data = []
 
             if self.request.GET.get('Category', 'false') == 'true':
-                for member in members:
-                    member_name = member.username
-
-                    for category in Category.objects.filter(user__in=members):
-                        category_count = Transaction.objects.filter(category=category, user=member).count()
-                        if category_count > 0:
-                            members_data.append({
-                                "name": member_name,
-                                "category": category.name,
-                                "category_count": category_count
-                            })
+                members_data = self.cached_overview(family, 'category')
 
             elif self.request.GET.get('Transaction', 'false') == 'true':
-                for member in members:
-                    member_name = member.username
-                    transaction_count = Transaction.objects.filter(user=member).count()
-
-                    members_data.append({
-                        "name": member_name,
-                        "transaction_count": transaction_count
-                    })
+                members_data = self.cached_overview(family, 'transaction')
 
             return Response(members_data, status=200)
         else:
@@ -307,6 +313,16 @@ class FamilyOverviewView(APIView):
 
 class FamilyHistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    report_columns = [
+        ReportColumn('id', "ID", 'id'),
+        ReportColumn('amount', "Amount", 'amount'),
+        ReportColumn('description', "Description", 'description', max_length=30),
+        ReportColumn('budget', "Budget", 'budget__name'),
+        ReportColumn('category', "Category", 'category__name'),
+        ReportColumn('account', "Account", 'account__name'),
+        ReportColumn('date', "Date", 'date'),
+        ReportColumn('transaction_type', "Type", 'transaction_type'),
+    ]
 
     def get_queryset(self, start_date=None, end_date=None, user_id=None):
         user = self.request.user
@@ -327,18 +343,14 @@ class FamilyHistoryView(APIView):
         return queryset
 
     def post(self, request, *args, **kwargs):
-        user = self.request.user
         user_id = request.data.get('user_id')
         start_date = request.data.get('start_date', None)
         end_date = request.data.get('end_date', None)
 
         if user_id:
             user_id = User.objects.get(id=user_id)
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
-            if user_id not in members:
+            members = family_member_ids(self.request)
+            if user_id.id not in members:
                 return Response({"detail": "You do not have permission to view this data"}, status=403)
         else:
             return Response(
@@ -365,8 +377,15 @@ class FamilyHistoryView(APIView):
             .order_by('date')
         )
 
-        if request.data.get('format') == 'pdf':
-            return self.create_pdf(aggregated_data, start_date, end_date)
+        report_format = request.data.get('format')
+        if report_format in REPORT_FORMATS:
+            return report_response(
+                report_format,
+                aggregated_data,
+                columns=self.report_columns,
+                title=f"Family History Report: {start_date} to {end_date}",
+                filename="family_history_report"
+            )
 
         response_data = [
             {
@@ -384,77 +403,57 @@ class FamilyHistoryView(APIView):
 
         return Response(response_data)
 
-    def create_pdf(self, aggregated_data, start_date, end_date):
-        buffer = BytesIO()
-
-        p = canvas.Canvas(buffer, pagesize=landscape(letter))
-        margin_left = 30
-        margin_top = 550
-        column_width = 70
-        headers = ["ID", "Amount", "Description", "Budget", "Category", "Account", "Date", "Type"]
-
-        p.setFont("Helvetica", 16)
-        p.drawString(margin_left + 100, margin_top, f"Family History Report: {start_date} to {end_date}")
-
-        p.setFont("Helvetica", 12)
-        y_position = margin_top - 30
-
-        for index, header in enumerate(headers):
-            p.drawString(margin_left + (index * column_width), y_position, header)
-
-        y_position -= 20
-
-        for entry in aggregated_data:
-            p.drawString(margin_left, y_position, str(entry['id']))
-            p.drawString(margin_left + column_width, y_position, str(entry['amount']))
-            p.drawString(margin_left + 2 * column_width, y_position, entry['description'][:30])
-            p.drawString(margin_left + 3 * column_width, y_position, entry['budget__name'])
-            p.drawString(margin_left + 4 * column_width, y_position, entry['category__name'])
-            p.drawString(margin_left + 5 * column_width, y_position, entry['account__name'])
-            p.drawString(margin_left + 6 * column_width, y_position, str(entry['date']))
-            p.drawString(margin_left + 7 * column_width, y_position, entry['transaction_type'])
-
-            y_position -= 20
-
-            if y_position < 100:
-                p.showPage()
-                y_position = margin_top
-                for index, header in enumerate(headers):
-                    p.drawString(margin_left + (index * column_width), y_position, header)
-                y_position -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="account_history_report.pdf"'
-        return response
-
 
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = self.request.user
+        stats = cached_report('user', user.id, 'profile', (), lambda: self.profile_stats(user))
 
-        transaction_count = Transaction.objects.filter(user=user).count()
         joined_date = user.date_joined
         formatted_date = joined_date.date().strftime('%Y-%m-%d')
-        net_balance = Transaction.objects.filter(user=user).aggregate(Sum('amount'))['amount__sum']
-        goal_met_count = SavingsGoal.objects.filter(account__user=user, goal_met=True).count()
-        net_income = Transaction.objects.filter(user=user , transaction_type='income').aggregate(Sum('amount'))['amount__sum']
-        net_expense = Transaction.objects.filter(user=user , transaction_type='expense').aggregate(Sum('amount'))['amount__sum']
 
         response_data = {
-            'total_transactions': transaction_count,
+            'total_transactions': stats['transaction_count'],
             'joined_date': formatted_date,
-            'savings_goals_met': goal_met_count,
+            'savings_goals_met': stats['savings_goals_met'],
+            'net_balance': stats['net_balance'],
+            'net_income': stats['net_income'],
+            'net_expense': stats['net_expense']
+        }
+
+        return Response(response_data)
+
+    def profile_stats(self, user):
+        # The totals come from the user's rollups and the goal count rides along as a scalar
+        # subquery, so a cache miss is one query even for a user with no rollups yet.
+        goals_met = (
+            SavingsGoal.objects.filter(account__user=OuterRef('pk'), goal_met=True)
+            .values('account__user')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        totals = User.objects.filter(pk=user.pk).annotate(
+            transaction_count=Sum('monthly_rollups__count'),
+            net_income=Sum('monthly_rollups__total', filter=Q(monthly_rollups__transaction_type='income')),
+            net_expense=Sum('monthly_rollups__total', filter=Q(monthly_rollups__transaction_type='expense')),
+            savings_goals_met=Coalesce(Subquery(goals_met), 0),
+        ).values('transaction_count', 'net_income', 'net_expense', 'savings_goals_met').get()
+        net_income = totals['net_income']
+        net_expense = totals['net_expense']
+        net_balance = None
+        if net_income is not None or net_expense is not None:
+            net_balance = (net_income or 0) - (net_expense or 0)
+
+        return {
+            'transaction_count': totals['transaction_count'] or 0,
+            'savings_goals_met': totals['savings_goals_met'],
             'net_balance': net_balance,
             'net_income': net_income,
             'net_expense': net_expense
         }
 
-        return Response(response_data)
-
 
 class CategoryViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -464,10 +463,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         user = self.request.user
 
         if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             return Category.objects.filter(user__in=members).distinct()
 
         return Category.objects.filter(user=user)
@@ -487,132 +483,59 @@ class CategoryDataView(APIView):
             next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
             end_date = (next_month - timedelta(days=1)).date()
 
-        category_data = []
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 
         if family_view and family:
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
-            categories = Category.objects.filter(user__in=members).distinct()
-            for category in categories:
-                income_transactions = Transaction.objects.filter(
-                    transaction_type='income',
-                    category_id=category.id,
-                    user__in=members,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).distinct('id')
-
-                expense_transactions = Transaction.objects.filter(
-                    transaction_type='expense',
-                    category_id=category.id,
-                    user__in=members,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).distinct('id')
-
-                total_income = sum(transaction.amount for transaction in income_transactions)
-
-                total_expenses = sum(transaction.amount for transaction in expense_transactions)
-
-                balance = total_income - total_expenses
-                category_data.append({
-                    "id": category.id,
-                    "name": category.name,
-                    "balance": balance
-                })
-
+            members = family_member_ids(self.request)
+            categories = Category.objects.filter(user__in=members)
+            return self.category_balances(categories, start_date, end_date, user__in=members)
         else:
-            categories = Category.objects.filter(user=user).distinct()
-            for category in categories:
-                income_transactions = Transaction.objects.filter(
-                    transaction_type='income',
-                    category_id=category.id,
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).distinct('id')
-
-                expense_transactions = Transaction.objects.filter(
-                    transaction_type='expense',
-                    category_id=category.id,
-                    user=user,
-                    date__gte=start_date,
-                    date__lte=end_date
-                ).distinct('id')
-
-                total_income = sum(transaction.amount for transaction in income_transactions)
-
-                total_expenses = sum(transaction.amount for transaction in expense_transactions)
-
-                balance = total_income - total_expenses
-                category_data.append({
-                    "id": category.id,
-                    "name": category.name,
-                    "balance": balance
-                })
+            categories = Category.objects.filter(user=user)
+            return self.category_balances(categories, start_date, end_date, user=user)
+
+    def category_balances(self, categories, start_date=None, end_date=None, **transaction_filter):
+        totals = rollup_totals(
+            ['category_id', 'transaction_type'],
+            start_date=start_date,
+            end_date=end_date,
+            category__in=categories,
+            **transaction_filter
+        )
+
+        category_data = []
+        for category in categories.values('id', 'name').order_by('id'):
+            total_income = totals.get((category['id'], 'income'), {}).get('total', 0)
+            total_expenses = totals.get((category['id'], 'expense'), {}).get('total', 0)
+            category_data.append({
+                "id": category['id'],
+                "name": category['name'],
+                "balance": total_income - total_expenses
+            })
         return category_data
 
-    def get(self, request, *args, **kwargs):
+    def all_time_balances(self, family_view=False):
         user = self.request.user
-        category_data = []
-        if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
-            categories = Category.objects.filter(user__in=members).distinct()
-            for category in categories:
-                income_transactions = Transaction.objects.filter(
-                    transaction_type='income',
-                    category_id=category.id,
-                    user__in=members
-                ).distinct('id')
-
-                expense_transactions = Transaction.objects.filter(
-                    transaction_type='expense',
-                    category_id=category.id,
-                    user__in=members
-                ).distinct('id')
-
-                total_income = sum(transaction.amount for transaction in income_transactions)
-
-                total_expenses = sum(transaction.amount for transaction in expense_transactions)
-
-                balance = total_income - total_expenses
-                category_data.append({
-                    "id": category.id,
-                    "name": category.name,
-                    "balance": balance
-                })
-            return Response(category_data, status=200)
+        if family_view:
+            members = family_member_ids(self.request)
+            categories = Category.objects.filter(user__in=members)
+            return self.category_balances(categories, user__in=members)
         else:
-            categories = Category.objects.filter(user=user).distinct()
-            for category in categories:
-                income_transactions = Transaction.objects.filter(
-                    transaction_type='income',
-                    category_id=category.id,
-                    user=user
-                ).distinct('id')
-
-                expense_transactions = Transaction.objects.filter(
-                    transaction_type='expense',
-                    category_id=category.id,
-                    user=user
-                ).distinct('id')
-
-                total_income = sum(transaction.amount for transaction in income_transactions)
-
-                total_expenses = sum(transaction.amount for transaction in expense_transactions)
-
-                balance = total_income - total_expenses
-                category_data.append({
-                    "id": category.id,
-                    "name": category.name,
-                    "balance": balance
-                })
-            return Response(category_data, status=200)
+            categories = Category.objects.filter(user=user)
+            return self.category_balances(categories, user=user)
+
+    def get(self, request, *args, **kwargs):
+        user = self.request.user
+        family_view = self.request.GET.get('familyView', 'false') == 'true'
+        family = user.families.first() if family_view else None
+
+        category_data = cached_report(
+            *report_owner(request, family_view, family), 'category_data_all_time', (family_view,),
+            lambda: self.all_time_balances(family_view)
+        )
+        return Response(category_data, status=200)
 
     def post(self, request, *args, **kwargs):
         start_date = request.data.get('start_date', None)
@@ -626,17 +549,29 @@ class CategoryDataView(APIView):
             except Family.DoesNotExist:
                 return Response({"detail": "Family not found for the user."}, status=404)
 
-        category_data = self.get_queryset(
-            start_date=start_date,
-            end_date=end_date,
-            family_view=family_view,
-            family=family
+        category_data = cached_report(
+            *report_owner(request, family_view, family), 'category_data', (start_date, end_date),
+            lambda: self.get_queryset(
+                start_date=start_date,
+                end_date=end_date,
+                family_view=family_view,
+                family=family
+            )
         )
         return Response(category_data, status=200)
 
 
 class CategoryHistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    report_columns = [
+        ReportColumn('id', "ID", 'id'),
+        ReportColumn('amount', "Amount", 'amount'),
+        ReportColumn('description', "Description", 'description', max_length=30),
+        ReportColumn('budget', "Budget", 'budget__name'),
+        ReportColumn('category', "Category", 'category__name'),
+        ReportColumn('date', "Date", 'date'),
+        ReportColumn('transaction_type', "Type", 'transaction_type'),
+    ]
 
     def get_queryset(self, start_date=None, end_date=None, category_id=None, family_view=False, family=None):
         user = self.request.user
@@ -706,8 +641,15 @@ class CategoryHistoryView(APIView):
             .order_by('date')
         )
 
-        if request.data.get('format') == 'pdf':
-            return self.create_pdf(aggregated_data, start_date, end_date)
+        report_format = request.data.get('format')
+        if report_format in REPORT_FORMATS:
+            return report_response(
+                report_format,
+                aggregated_data,
+                columns=self.report_columns,
+                title=f"Category History Report: {start_date} to {end_date}",
+                filename="category_history_report"
+            )
 
         response_data = [
             {
@@ -725,51 +667,6 @@ class CategoryHistoryView(APIView):
         return Response(response_data)
 
 
-    def create_pdf(self, aggregated_data, start_date, end_date):
-        buffer = BytesIO()
-
-        p = canvas.Canvas(buffer, pagesize=landscape(letter))
-        margin_left = 30
-        margin_top = 550
-        column_width = 70
-        headers = ["ID", "Amount", "Description", "Budget", "Category", "Date", "Type"]
-
-        p.setFont("Helvetica", 16)
-        p.drawString(margin_left + 100, margin_top, f"Category History Report: {start_date} to {end_date}")
-
-        p.setFont("Helvetica", 12)
-        y_position = margin_top - 30
-
-        for index, header in enumerate(headers):
-            p.drawString(margin_left + (index * column_width), y_position, header)
-
-        y_position -= 20
-
-        for entry in aggregated_data:
-            p.drawString(margin_left, y_position, str(entry['id']))
-            p.drawString(margin_left + column_width, y_position, str(entry['amount']))
-            p.drawString(margin_left + 2 * column_width, y_position, entry['description'][:30])
-            p.drawString(margin_left + 3 * column_width, y_position, entry['budget__name'])
-            p.drawString(margin_left + 4 * column_width, y_position, entry['category__name'])
-            p.drawString(margin_left + 5 * column_width, y_position, str(entry['date']))
-            p.drawString(margin_left + 6 * column_width, y_position, entry['transaction_type'])
-
-            y_position -= 20
-
-            if y_position < 100:
-                p.showPage()
-                y_position = margin_top
-                for index, header in enumerate(headers):
-                    p.drawString(margin_left + (index * column_width), y_position, header)
-                y_position -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="category_history_report.pdf"'
-        return response
-
-
 class CategoryHistoryLineChartView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -782,89 +679,47 @@ class CategoryHistoryLineChartView(APIView):
             end_date = (next_month - timedelta(days=1)).date()
 
         if family_view and family:
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             categories = Category.objects.filter(user__in=members).distinct()
 
-            date_balances = defaultdict(lambda: {category.name: None for category in categories})
-
             queryset = Transaction.objects.filter(
                 category__in=categories,
                 user__in=members,
                 date__gte=start_date,
                 date__lte=end_date
             )
-            return queryset, date_balances, categories
-
         else:
             categories = Category.objects.filter(user=user)
 
-            date_balances = defaultdict(lambda: {category.name: None for category in categories})
-
             queryset = Transaction.objects.filter(
                 category__in=categories,
                 user=user,
                 date__gte=start_date,
                 date__lte=end_date
             )
-            return queryset, date_balances, categories
+        return queryset, categories, start_date, end_date
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
         today = datetime.today().date()
         first_day_of_month = today.replace(day=1)
         last_day_of_month = today.replace(day=calendar.monthrange(today.year, today.month)[1])
-        family_view = request.GET.get('familyView', 'false') == 'true'
-
-        family = None
-        if family_view:
-            try:
-                family = request.user.families.first()
-            except Family.DoesNotExist:
-                return Response({"detail": "Family not found for the user."}, status=404)
-
-        if family_view and family:
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
-            categories = Category.objects.filter(user__in=members).distinct()
-        else:
-            categories = Category.objects.filter(user=request.user)
-
-        date_balances = defaultdict(lambda: {category.name: None for category in categories})
-
-        transactions = Transaction.objects.filter(
-            category__in=categories,
-            date__gte=first_day_of_month,
-            date__lte=last_day_of_month
-        )
-
-        for history in transactions:
-            if date_balances[history.date][history.category.name] is None:
-                date_balances[history.date][history.category.name] = 0
-            date_balances[history.date][history.category.name] += history.amount
-
-        data = []
-        for single_date in self._get_dates_in_month(first_day_of_month, last_day_of_month):
-            formatted_entry = {
-                'name': single_date.strftime('%Y-%m-%d'),
-            }
-
-            for category in categories:
-                balance = date_balances[single_date].get(category.name, None)
-
-                formatted_entry[category.name] = balance
-
-            data.append(formatted_entry)
-
-        return Response(data)
+        return self.history_response(request, first_day_of_month, last_day_of_month)
 
     def post(self, request, *args, **kwargs):
         start_date = request.data.get('start_date', None)
         end_date = request.data.get('end_date', None)
+
+        try:
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"detail": "Invalid date format. Use 'YYYY-MM-DD'."}, status=400)
+
+        return self.history_response(request, start_date, end_date)
+
+    def history_response(self, request, start_date=None, end_date=None):
         family_view = request.GET.get('familyView', 'false') == 'true'
 
         family = None
@@ -874,37 +729,38 @@ class CategoryHistoryLineChartView(APIView):
             except Family.DoesNotExist:
                 return Response({"detail": "Family not found for the user."}, status=404)
 
-        if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-        transactions, date_balances, categories = self.get_queryset(
+        transactions, categories, start_date, end_date = self.get_queryset(
             start_date=start_date,
             end_date=end_date,
             family_view=family_view,
             family=family
         )
 
-        for history in transactions:
-            if date_balances[history.date][history.category.name] is None:
-                date_balances[history.date][history.category.name] = 0
-            date_balances[history.date][history.category.name] += history.amount
-
-        data = []
-        for single_date in self._get_dates_in_month(start_date, end_date):
-            formatted_entry = {
-                'name': single_date.strftime('%Y-%m-%d'),
-            }
-
-            for category in categories:
-                balance = date_balances[single_date].get(category.name, None)
+        data = cached_report(
+            *report_owner(request, family_view, family), 'category_history_line_chart',
+            (start_date, end_date),
+            lambda: self.category_series(transactions, categories, start_date, end_date)
+        )
+        return Response(data, status=200)
 
-                formatted_entry[category.name] = balance
+    def category_series(self, transactions, categories, start_date, end_date):
+        # Only days with transactions are held in memory; every other day is the empty row.
+        empty_row = dict.fromkeys(categories.order_by('id').values_list('name', flat=True))
 
-            data.append(formatted_entry)
+        daily_totals = defaultdict(dict)
+        totals = (
+            transactions
+            .values('date', 'category__name')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for entry in totals:
+            daily_totals[entry['date']][entry['category__name']] = entry['total']
 
-        return Response(data, status=200)
+        return [
+            {'name': single_date.strftime('%Y-%m-%d'), **empty_row, **daily_totals.get(single_date, {})}
+            for single_date in self._get_dates_in_month(start_date, end_date)
+        ]
 
     def _get_dates_in_month(self, start_date, end_date):
         current_date = start_date
@@ -921,10 +777,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
         user = self.request.user
 
         if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             return Budget.objects.filter(user__in=members).distinct()
 
         return Budget.objects.filter(user=user)
@@ -953,6 +806,15 @@ class BudgetViewSet(viewsets.ModelViewSet):
 
 class BudgetHistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    report_columns = [
+        ReportColumn('id', "ID", 'id'),
+        ReportColumn('amount', "Amount", 'amount'),
+        ReportColumn('description', "Description", 'description', max_length=30),
+        ReportColumn('budget', "Budget", 'budget__name'),
+        ReportColumn('category', "Category", 'category__name'),
+        ReportColumn('date', "Date", 'date'),
+        ReportColumn('transaction_type', "Type", 'transaction_type'),
+    ]
 
     def get_queryset(self, start_date=None, end_date=None, budget_id=None, family_view=False, family=None):
         user = self.request.user
@@ -1021,8 +883,15 @@ class BudgetHistoryView(APIView):
             .order_by('date')
         )
 
-        if request.data.get('format') == 'pdf':
-            return self.create_pdf(aggregated_data, start_date, end_date)
+        report_format = request.data.get('format')
+        if report_format in REPORT_FORMATS:
+            return report_response(
+                report_format,
+                aggregated_data,
+                columns=self.report_columns,
+                title=f"Budget History Report: {start_date} to {end_date}",
+                filename="budget_history_report"
+            )
 
         response_data = [
             {
@@ -1039,50 +908,6 @@ class BudgetHistoryView(APIView):
 
         return Response(response_data)
 
-    def create_pdf(self, aggregated_data, start_date, end_date):
-        buffer = BytesIO()
-
-        p = canvas.Canvas(buffer, pagesize=landscape(letter))
-        margin_left = 30
-        margin_top = 550
-        column_width = 70
-        headers = ["ID", "Amount", "Description", "Budget", "Category", "Date", "Type"]
-
-        p.setFont("Helvetica", 16)
-        p.drawString(margin_left + 100, margin_top, f"Budget History Report: {start_date} to {end_date}")
-
-        p.setFont("Helvetica", 12)
-        y_position = margin_top - 30
-
-        for index, header in enumerate(headers):
-            p.drawString(margin_left + (index * column_width), y_position, header)
-
-        y_position -= 20
-
-        for entry in aggregated_data:
-            p.drawString(margin_left, y_position, str(entry['id']))
-            p.drawString(margin_left + column_width, y_position, str(entry['amount']))
-            p.drawString(margin_left + 2 * column_width, y_position, entry['description'][:30])
-            p.drawString(margin_left + 3 * column_width, y_position, entry['budget__name'])
-            p.drawString(margin_left + 4 * column_width, y_position, entry['category__name'])
-            p.drawString(margin_left + 5 * column_width, y_position, str(entry['date']))
-            p.drawString(margin_left + 6 * column_width, y_position, entry['transaction_type'])
-
-            y_position -= 20
-
-            if y_position < 100:
-                p.showPage()
-                y_position = margin_top
-                for index, header in enumerate(headers):
-                    p.drawString(margin_left + (index * column_width), y_position, header)
-                y_position -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="account_history_report.pdf"'
-        return response
-
 
 class BudgetGoalView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1135,16 +960,21 @@ class BudgetTransactionView(APIView):
             except Family.DoesNotExist:
                 return Response({"detail": "Family not found for the user."}, status=404)
 
+        data = cached_report(
+            *report_owner(request, family_view, family), 'budget_transactions', (start_date, end_date),
+            lambda: self.budget_report(start_date, end_date, family_view, family)
+        )
+        return Response(data)
+
+    def budget_report(self, start_date, end_date, family_view=False, family=None):
+        user = self.request.user
         if family_view and family:
             transaction_queryset = Transaction.objects.filter(
                 family=family.id,
                 date__gte = start_date,
                 date__lte = end_date
             )
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             budget_queryset = Budget.objects.filter(user__in=members).distinct()
         else:
             transaction_queryset = Transaction.objects.filter(
@@ -1154,33 +984,35 @@ class BudgetTransactionView(APIView):
             )
             budget_queryset = Budget.objects.filter(user=user)
 
-        budgets_remaining = []
-        for budget in budget_queryset:
-            budget_transactions = Transaction.objects.filter(budget=budget, date__range=[start_date,
-                                                                                         end_date])
-
-            total_income = budget_transactions.filter(transaction_type='income').aggregate(Sum('amount'))[
-                               'amount__sum'] or 0
-
-            total_expense = budget_transactions.filter(transaction_type='expense').aggregate(Sum('amount'))[
-                                'amount__sum'] or 0
+        totals = rollup_totals(
+            ['budget_id', 'transaction_type'],
+            start_date=start_date,
+            end_date=end_date,
+            budget__in=budget_queryset
+        )
 
-            total_remaining = budget.total_amount - total_expense
+        budgets_remaining = []
+        for budget in budget_queryset.values('id', 'name', 'total_amount'):
+            total_income = totals.get((budget['id'], 'income'), {}).get('total', 0)
+            total_expense = totals.get((budget['id'], 'expense'), {}).get('total', 0)
 
             budgets_remaining.append({
-                'budget_name': budget.name,
-                'starting_budget': budget.total_amount,
-                'remaining_budget': total_remaining,
+                'budget_name': budget['name'],
+                'starting_budget': budget['total_amount'],
+                'remaining_budget': budget['total_amount'] - total_expense,
                 'total_income': total_income,
                 'total_expense': total_expense,
             })
 
-        transaction_serializer = TransactionSerializer(transaction_queryset, many=True)
+        transactions = [
+            transaction_row(entry)
+            for entry in transaction_values(transaction_queryset).iterator(chunk_size=2000)
+        ]
 
-        return Response({
-            'transactions': transaction_serializer.data,
+        return {
+            'transactions': transactions,
             'budgets_remaining': budgets_remaining
-        })
+        }
 
 
 class TransactionViewSet(viewsets.ModelViewSet):
@@ -1202,10 +1034,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
             return Response({"error": "Account is required."}, status=400)
 
         if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
 
             account = Account.objects.filter(id=account_id, user__in=members).first()
             if not account:
@@ -1295,10 +1124,6 @@ class TransactionViewSet(viewsets.ModelViewSet):
         data = request.data.copy()
 
         if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
             if Family.objects.filter(members=user):
                 try:
                     family = request.user.families.first()
@@ -1344,6 +1169,88 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=400)
 
 
+class TransactionImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_fields = ['account', 'category', 'budget']
+
+    def get_rows(self, request):
+        upload = request.FILES.get('file')
+        if upload:
+            rows = parse_rows(import_format(upload.name), decode_upload(upload))
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('transactions')
+            if not isinstance(rows, list):
+                raise TransactionImportError("Expected a list of transactions or an uploaded file.")
+
+        # Statement formats carry no account, category or budget, so those can be given once for
+        # the whole import and are overridden by any value on the row itself. Blank cells (a CSV
+        # column left empty on some rows) count as no value rather than overriding the default.
+        defaults = {}
+        if not isinstance(request.data, list):
+            defaults = {field: request.data[field] for field in self.default_fields if request.data.get(field)}
+        return [
+            {**defaults, **{key: value for key, value in row.items() if value not in (None, '')}}
+            if isinstance(row, dict) else row
+            for row in rows
+        ]
+
+    def post(self, request, *args, **kwargs):
+        user = request.user
+
+        try:
+            rows = self.get_rows(request)
+        except TransactionImportError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        if not rows:
+            return Response({"detail": "No transactions to import."}, status=400)
+
+        serializer = TransactionImportSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            errors = [
+                {"row": index + 1, "errors": row_errors}
+                for index, row_errors in enumerate(serializer.errors) if row_errors
+            ]
+            return Response({"errors": errors}, status=400)
+        rows = serializer.validated_data
+
+        if self.request.GET.get('familyView', 'false') == 'true':
+            members = family_member_ids(self.request)
+        else:
+            members = {user.id}
+
+        for field, model in (('account', Account), ('category', Category), ('budget', Budget)):
+            ids = {row[field] for row in rows}
+            owned = set(model.objects.filter(id__in=ids, user__in=members).values_list('id', flat=True))
+            missing = sorted(ids - owned)
+            if missing:
+                return Response(
+                    {"error": f"{model.__name__} {', '.join(map(str, missing))} does not exist or does not belong to the user."},
+                    status=400
+                )
+
+        family = user.families.first()
+        transactions = [
+            Transaction(
+                date=row['date'],
+                amount=row['amount'],
+                transaction_type=row['transaction_type'],
+                description=row['description'],
+                account_id=row['account'],
+                category_id=row['category'],
+                budget_id=row['budget'],
+                user=user,
+                family=family,
+            )
+            for row in rows
+        ]
+        created = create_transactions(transactions)
+
+        return Response({"created": len(created)}, status=201)
+
+
 class AllTransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
@@ -1355,52 +1262,49 @@ class AllTransactionViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
 
-        total_income = queryset.filter(transaction_type='income').aggregate(total_income=Sum('amount'))[
-                           'total_income'] or 0
-
-        total_expenses = queryset.filter(transaction_type='expense').aggregate(total_expenses=Sum('amount'))[
-                             'total_expenses'] or 0
+        fields = request.query_params.get('fields')
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            unknown_fields = [field for field in fields if field not in TRANSACTION_VALUE_FIELDS]
+            if unknown_fields:
+                return Response({"detail": f"Unknown fields: {', '.join(unknown_fields)}"}, status=400)
 
+        totals = queryset.aggregate(
+            total_income=Sum('amount', filter=Q(transaction_type='income')),
+            total_expenses=Sum('amount', filter=Q(transaction_type='expense')),
+        )
+        total_income = totals['total_income'] or 0
+        total_expenses = totals['total_expenses'] or 0
         net_income = total_income - total_expenses
 
-        transactions = TransactionSerializer(queryset, many=True).data
-
         response_data = {
             'total_income': total_income,
             'total_expenses': total_expenses,
             'net_income': net_income,
-            'transactions': transactions
         }
 
+        paginator = TransactionCursorPagination()
+        if settings.TRANSACTION_LIST_COMPAT and not paginator.is_requested(request):
+            response_data['transactions'] = [
+                transaction_row(entry, fields)
+                for entry in transaction_values(queryset, fields).iterator(chunk_size=2000)
+            ]
+            return Response(response_data)
+
+        page = paginator.paginate_queryset(transaction_values(queryset, fields), request, view=self)
+        response_data['transactions'] = [transaction_row(entry, fields) for entry in page]
+        response_data['next'] = paginator.get_next_link()
+
         return Response(response_data)
 
 
 class TransactionBarChartViewSet(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self, start_date=None, end_date=None, family_view=False, family=None):
-        user = self.request.user
-
-        if not start_date or not end_date:
-            current_date = datetime.today()
-            start_date = current_date.replace(day=1).date()
-            next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-            end_date = (next_month - timedelta(days=1)).date()
-
+    def get_filters(self, family_view=False, family=None):
         if family_view and family:
-            queryset = Transaction.objects.filter(
-                family=family.id,
-                date__gte = start_date,
-                date__lte = end_date
-            )
-            return queryset
-        else:
-            queryset = Transaction.objects.filter(
-                user=user,
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            return queryset
+            return {'family': family.id}
+        return {'user': self.request.user}
 
     def post(self, request, *args, **kwargs):
         start_date = request.data.get('start_date', None)
@@ -1431,33 +1335,42 @@ class TransactionBarChartViewSet(APIView):
                 status=400
             )
 
-        queryset = self.get_queryset(
-            start_date=start_date,
-            end_date=end_date,
-            family_view=family_view,
-            family=family
+        response_data = cached_report(
+            *report_owner(request, family_view, family), 'transaction_bar_chart', (start_date, end_date),
+            lambda: self.category_totals(start_date, end_date, family_view, family)
         )
+        return Response(response_data)
 
-        aggregated_data = (
-            queryset
-            .values('category__name')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('category__name')
+    def category_totals(self, start_date, end_date, family_view=False, family=None):
+        totals = rollup_totals(
+            ['category__name'],
+            start_date=start_date,
+            end_date=end_date,
+            **self.get_filters(family_view, family)
         )
 
-        response_data = [
+        return [
             {
-                "category": entry['category__name'],
-                "total_amount": str(entry['total_amount'])
+                "category": category_name,
+                "total_amount": str(values['total'])
             }
-            for entry in aggregated_data
+            for (category_name,), values in sorted(totals.items())
         ]
 
-        return Response(response_data)
-
 
 class TransactionTableViewSet(APIView):
     permission_classes = [IsAuthenticated]
+    report_columns = [
+        ReportColumn('id', "ID", 'id'),
+        ReportColumn('amount', "Amount", 'amount'),
+        ReportColumn('description', "Description", 'description', max_length=30),
+        ReportColumn('budget', "Budget", 'budget__name'),
+        ReportColumn('category', "Category", 'category__name'),
+        ReportColumn('date', "Date", 'date'),
+        ReportColumn('transaction_type', "Type", 'transaction_type'),
+        ReportColumn('is_recurring', "Recurring?", 'is_recurring'),
+        ReportColumn('next_occurrence', "Next Occurrence", 'next_occurrence'),
+    ]
 
     def get_queryset(self, start_date=None, end_date=None, family_view=False, family=None):
         user = self.request.user
@@ -1526,7 +1439,12 @@ class TransactionTableViewSet(APIView):
         )
 
         if request.data.get('format') == 'pdf':
-            return self.create_pdf(aggregated_data, start_date, end_date)
+            report = PDFReport(
+                title=f"Transaction Report: {start_date} to {end_date}",
+                columns=self.report_columns,
+                filename="transaction_report.pdf"
+            )
+            return report.response(aggregated_data)
 
         response_data = [
             {
@@ -1546,83 +1464,14 @@ class TransactionTableViewSet(APIView):
 
         return Response(response_data)
 
-    def create_pdf(self, aggregated_data, start_date, end_date):
-        buffer = BytesIO()
-
-        p = canvas.Canvas(buffer, pagesize=landscape(letter))
-        margin_left = 30
-        margin_top = 550
-        column_width = 70
-        headers = ["ID", "Amount", "Description", "Budget", "Category", "Date", "Type", "Recurring?",
-                   "Next Occurrence"]
-
-        p.setFont("Helvetica", 16)
-        p.drawString(margin_left + 100, margin_top, f"Transaction Report: {start_date} to {end_date}")
-
-        p.setFont("Helvetica", 12)
-        y_position = margin_top - 30
-
-        for index, header in enumerate(headers):
-            p.drawString(margin_left + (index * column_width), y_position, header)
-
-        y_position -= 20
-
-        for entry in aggregated_data:
-            p.drawString(margin_left, y_position, str(entry['id']))
-            p.drawString(margin_left + column_width, y_position, str(entry['amount']))
-            p.drawString(margin_left + 2 * column_width, y_position, entry['description'][:30])
-            p.drawString(margin_left + 3 * column_width, y_position, entry['budget__name'])
-            p.drawString(margin_left + 4 * column_width, y_position, entry['category__name'])
-            p.drawString(margin_left + 5 * column_width, y_position, str(entry['date']))
-            p.drawString(margin_left + 6 * column_width, y_position, entry['transaction_type'])
-            p.drawString(margin_left + 7 * column_width, y_position, str(entry['is_recurring']))
-            p.drawString(margin_left + 8 * column_width, y_position,
-                         str(entry['next_occurrence']) if entry['next_occurrence'] else "N/A")
-
-            y_position -= 20
-
-            if y_position < 100:
-                p.showPage()
-                y_position = margin_top
-                for index, header in enumerate(headers):
-                    p.drawString(margin_left + (index * column_width), y_position, header)
-                y_position -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="transaction_report.pdf"'
-        return response
-
 
 class TransactionPieChartViewSet(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self, start_date=None, end_date=None, family_view=False, family=None):
-        user = self.request.user
-
-        if not start_date or not end_date:
-            current_date = datetime.today()
-            start_date = current_date.replace(day=1).date()
-            next_month = (current_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-            end_date = (next_month - timedelta(days=1)).date()
-
+    def get_filters(self, family_view=False, family=None):
         if family_view and family:
-            queryset = Transaction.objects.filter(
-                family=family.id,
-                transaction_type='expense',
-                date__gte = start_date,
-                date__lte = end_date
-            )
-            return queryset
-        else:
-            queryset = Transaction.objects.filter(
-                user=user,
-                transaction_type='expense',
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            return queryset
+            return {'family': family.id}
+        return {'user': self.request.user}
 
     def post(self, request, *args, **kwargs):
         start_date = request.data.get('start_date', None)
@@ -1655,30 +1504,29 @@ class TransactionPieChartViewSet(APIView):
 
         print(f"Converted Start Date; {start_date}, End date: {end_date}")
 
-        queryset = self.get_queryset(
-            start_date=start_date,
-            end_date=end_date,
-            family_view=family_view,
-            family=family
+        response_data = cached_report(
+            *report_owner(request, family_view, family), 'transaction_pie_chart', (start_date, end_date),
+            lambda: self.expense_totals(start_date, end_date, family_view, family)
         )
+        return Response(response_data)
 
-        aggregated_data = (
-            queryset
-            .values('category__name')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('category__name')
+    def expense_totals(self, start_date, end_date, family_view=False, family=None):
+        totals = rollup_totals(
+            ['category__name'],
+            start_date=start_date,
+            end_date=end_date,
+            transaction_type='expense',
+            **self.get_filters(family_view, family)
         )
 
-        response_data = [
+        return [
             {
-                "name": entry['category__name'],
-                "value": entry['total_amount']
+                "name": category_name,
+                "value": values['total']
             }
-            for entry in aggregated_data
+            for (category_name,), values in sorted(totals.items())
         ]
 
-        return Response(response_data)
-
 
 class AccountViewSet(APIView):
     permission_classes = [IsAuthenticated]
@@ -1687,10 +1535,7 @@ class AccountViewSet(APIView):
         user = self.request.user
 
         if self.request.GET.get('familyView', 'false') == 'true':
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             return Account.objects.filter(user__in=members).distinct()
 
         return Account.objects.filter(user=user)
@@ -1724,38 +1569,39 @@ class AccountsOverviewReportView(APIView):
             end_date = (next_month - timedelta(days=1)).date()
 
         if family_view and family:
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
+            members = family_member_ids(self.request)
             accounts = Account.objects.filter(user__in=members).distinct()
-
-            date_balances = defaultdict(lambda: {account.name: None for account in accounts})
-
-            queryset = BalanceHistory.objects.filter(
-                account__in=accounts,
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            return queryset, date_balances, accounts
-
         else:
             accounts = Account.objects.filter(user=user)
 
-            date_balances = defaultdict(lambda: {account.name: None for account in accounts})
-
-            queryset = BalanceHistory.objects.filter(
-                account__in=accounts,
-                date__gte=start_date,
-                date__lte=end_date
-            )
-            return queryset, date_balances, accounts
+        queryset = BalanceHistory.objects.filter(
+            account__in=accounts,
+            date__gte=start_date,
+            date__lte=end_date
+        )
+        return queryset, accounts, start_date, end_date
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
         today = datetime.today().date()
         first_day_of_month = today.replace(day=1)
         last_day_of_month = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+        return self.overview_response(request, first_day_of_month, last_day_of_month)
+
+    def post(self, request, *args, **kwargs):
+        start_date = request.data.get('start_date', None)
+        end_date = request.data.get('end_date', None)
+
+        try:
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"detail": "Invalid date format. Use 'YYYY-MM-DD'."}, status=400)
+
+        return self.overview_response(request, start_date, end_date)
+
+    def overview_response(self, request, start_date=None, end_date=None):
         family_view = request.GET.get('familyView', 'false') == 'true'
 
         family = None
@@ -1765,49 +1611,94 @@ class AccountsOverviewReportView(APIView):
             except Family.DoesNotExist:
                 return Response({"detail": "Family not found for the user."}, status=404)
 
-        if family_view and family:
-            families = user.families.all()
-            members = []
-            for family in families:
-                members.extend(family.members.all())
-            accounts = Account.objects.filter(user__in=members).distinct()
-        else:
-            accounts = Account.objects.filter(user=request.user)
-
-        date_balances = defaultdict(lambda: {account.name: None for account in accounts})
+        queryset, accounts, start_date, end_date = self.get_queryset(
+            start_date=start_date,
+            end_date=end_date,
+            family_view=family_view,
+            family=family
+        )
 
-        balance_histories = BalanceHistory.objects.filter(
-            account__in=accounts,
-            date__gte=first_day_of_month,
-            date__lte=last_day_of_month
+        data = cached_report(
+            *report_owner(request, family_view, family), 'accounts_overview', (start_date, end_date),
+            lambda: self.balance_series(queryset, accounts, start_date, end_date)
         )
+        return Response(data, status=200)
 
-        for history in balance_histories:
-            date_balances[history.date][history.account.name] = history.balance
+    def balance_series(self, queryset, accounts, start_date, end_date):
+        # Each account starts the range at its last snapshot before it (or its opening balance),
+        # and every day then carries the latest balance forward.
+        carried = (
+            BalanceHistory.objects
+            .filter(account=OuterRef('pk'), date__lt=start_date)
+            .order_by('-date')
+            .values('balance')[:1]
+        )
+        balances = dict(
+            accounts
+            .annotate(carried_balance=Coalesce(Subquery(carried), 'opening_balance'))
+            .order_by('id')
+            .values_list('name', 'carried_balance')
+        )
 
-        previous_balances = {account.name: None for account in accounts}
+        snapshots = iter(queryset.values('date', 'account__name', 'balance').order_by('date'))
+        snapshot = next(snapshots, None)
 
         data = []
-        for single_date in self._get_dates_in_month(first_day_of_month, last_day_of_month):
-            formatted_entry = {
-                'name': single_date.strftime('%Y-%m-%d'),
-            }
+        for single_date in self._get_dates_in_month(start_date, end_date):
+            while snapshot is not None and snapshot['date'] == single_date:
+                balances[snapshot['account__name']] = snapshot['balance']
+                snapshot = next(snapshots, None)
 
-            for account in accounts:
-                balance = date_balances[single_date].get(account.name, None)
+            data.append({'name': single_date.strftime('%Y-%m-%d'), **balances})
 
-                if balance is None and previous_balances.get(account.name) is not None:
-                    balance = previous_balances[account.name]
+        return data
 
-                formatted_entry[account.name] = balance
+    def _get_dates_in_month(self, start_date, end_date):
+        current_date = start_date
+        while current_date <= end_date:
+            yield current_date
+            current_date += timedelta(days=1)
 
-            data.append(formatted_entry)
 
-        return Response(data)
+class NetWorthView(APIView):
+    permission_classes = [IsAuthenticated]
+    intervals = ['day', 'week', 'month']
+
+    def get_accounts(self, family_view=False, family=None):
+        user = self.request.user
+        if family_view and family:
+            members = family_member_ids(self.request)
+            return Account.objects.filter(user__in=members).distinct()
+        return Account.objects.filter(user=user)
+
+    def get(self, request, *args, **kwargs):
+        today = datetime.today().date()
+        start_date = add_months(today.replace(day=1), -11)
+        return self.net_worth_response(request, start_date, today, 'month')
 
     def post(self, request, *args, **kwargs):
         start_date = request.data.get('start_date', None)
         end_date = request.data.get('end_date', None)
+        interval = request.data.get('interval', 'month')
+
+        if interval not in self.intervals:
+            return Response({"detail": f"Invalid interval. Use one of: {', '.join(self.intervals)}."}, status=400)
+
+        if not start_date or not end_date:
+            return Response({"detail": "start_date and end_date are required."}, status=400)
+
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({"detail": "Invalid date format. Use 'YYYY-MM-DD'."}, status=400)
+
+        if start_date > end_date:
+            return Response({"detail": "start_date must be on or before end_date."}, status=400)
+
+        return self.net_worth_response(request, start_date, end_date, interval)
+
+    def net_worth_response(self, request, start_date, end_date, interval):
         family_view = request.GET.get('familyView', 'false') == 'true'
 
         family = None
@@ -1817,50 +1708,54 @@ class AccountsOverviewReportView(APIView):
             except Family.DoesNotExist:
                 return Response({"detail": "Family not found for the user."}, status=404)
 
-        if start_date:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        if end_date:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-
-        queryset, date_balances, accounts = self.get_queryset(
-            start_date=start_date,
-            end_date=end_date,
-            family_view=family_view,
-            family=family
+        accounts = self.get_accounts(family_view, family)
+        data = cached_report(
+            *report_owner(request, family_view, family), 'net_worth', (start_date, end_date, interval),
+            lambda: self.net_worth_series(accounts, start_date, end_date, interval)
         )
+        return Response(data, status=200)
 
-        for history in queryset:
-            date_balances[history.date][history.account.name] = history.balance
-
-        previous_balances = {account.name: None for account in accounts}
+    def net_worth_series(self, accounts, start_date, end_date, interval):
+        dates = list(self._get_dates(start_date, end_date, interval))
+        balances = balances_at(accounts.values_list('id', flat=True), dates)
 
-        data = []
-        for single_date in self._get_dates_in_month(start_date, end_date):
-            formatted_entry = {
+        return [
+            {
                 'name': single_date.strftime('%Y-%m-%d'),
+                'net_worth': sum(balance for balance in balances[single_date].values() if balance is not None)
             }
+            for single_date in dates
+        ]
 
-            for account in accounts:
-                balance = date_balances[single_date].get(account.name, None)
-
-                if balance is None and previous_balances.get(account.name) is not None:
-                    balance = previous_balances[account.name]
-
-                formatted_entry[account.name] = balance
-
-            data.append(formatted_entry)
-
-        return Response(data, status=200)
-
-    def _get_dates_in_month(self, start_date, end_date):
+    def _get_dates(self, start_date, end_date, interval):
+        # Each point is the balance at the close of its day, week or month; the last point is
+        # always end_date itself.
         current_date = start_date
-        while current_date <= end_date:
-            yield current_date
-            current_date += timedelta(days=1)
+        while current_date < end_date:
+            if interval == 'day':
+                point = current_date
+            elif interval == 'week':
+                point = current_date + timedelta(days=6)
+            else:
+                point = current_date.replace(day=calendar.monthrange(current_date.year, current_date.month)[1])
+            if point >= end_date:
+                break
+            yield point
+            current_date = point + timedelta(days=1)
+        yield end_date
 
 
 class AccountHistory(APIView):
     permission_classes = [IsAuthenticated]
+    report_columns = [
+        ReportColumn('id', "ID", 'id'),
+        ReportColumn('amount', "Amount", 'amount'),
+        ReportColumn('description', "Description", 'description', max_length=30),
+        ReportColumn('budget', "Budget", 'budget__name'),
+        ReportColumn('category', "Category", 'category__name'),
+        ReportColumn('date', "Date", 'date'),
+        ReportColumn('transaction_type', "Type", 'transaction_type'),
+    ]
 
     def get_queryset(self, start_date=None, end_date=None, account_id=None, family_view=False, family=None):
         user = self.request.user
@@ -1930,8 +1825,15 @@ class AccountHistory(APIView):
             .order_by('date')
         )
 
-        if request.data.get('format') == 'pdf':
-            return self.create_pdf(aggregated_data, start_date, end_date)
+        report_format = request.data.get('format')
+        if report_format in REPORT_FORMATS:
+            return report_response(
+                report_format,
+                aggregated_data,
+                columns=self.report_columns,
+                title=f"Account History Report: {start_date} to {end_date}",
+                filename="account_history_report"
+            )
 
         response_data = [
             {
@@ -1948,50 +1850,6 @@ class AccountHistory(APIView):
 
         return Response(response_data)
 
-    def create_pdf(self, aggregated_data, start_date, end_date):
-        buffer = BytesIO()
-
-        p = canvas.Canvas(buffer, pagesize=landscape(letter))
-        margin_left = 30
-        margin_top = 550
-        column_width = 70
-        headers = ["ID", "Amount", "Description", "Budget", "Category", "Date", "Type"]
-
-        p.setFont("Helvetica", 16)
-        p.drawString(margin_left + 100, margin_top, f"Account History Report: {start_date} to {end_date}")
-
-        p.setFont("Helvetica", 12)
-        y_position = margin_top - 30
-
-        for index, header in enumerate(headers):
-            p.drawString(margin_left + (index * column_width), y_position, header)
-
-        y_position -= 20
-
-        for entry in aggregated_data:
-            p.drawString(margin_left, y_position, str(entry['id']))
-            p.drawString(margin_left + column_width, y_position, str(entry['amount']))
-            p.drawString(margin_left + 2 * column_width, y_position, entry['description'][:30])
-            p.drawString(margin_left + 3 * column_width, y_position, entry['budget__name'])
-            p.drawString(margin_left + 4 * column_width, y_position, entry['category__name'])
-            p.drawString(margin_left + 5 * column_width, y_position, str(entry['date']))
-            p.drawString(margin_left + 6 * column_width, y_position, entry['transaction_type'])
-
-            y_position -= 20
-
-            if y_position < 100:
-                p.showPage()
-                y_position = margin_top
-                for index, header in enumerate(headers):
-                    p.drawString(margin_left + (index * column_width), y_position, header)
-                y_position -= 20
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="account_history_report.pdf"'
-        return response
-
 
 class SavingsGoalView(APIView):
     permission_classes = [IsAuthenticated]